@@ -0,0 +1,171 @@
+"""
+Admission control for model calls.
+Caps how many Claude requests run at once across the whole process, queues the
+rest in FIFO order, and coalesces identical in-flight requests into one call.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+QueueCallback = Callable[[int], None]
+
+
+def request_key(*parts: str) -> str:
+    """Build a stable key for a request from its parts (model, prompt, question...)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _LeaderInterrupted(Exception):
+    """The caller running a coalesced request was interrupted (e.g. a Streamlit rerun)."""
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = 4, poll_interval: float = 0.5):
+        self.max_concurrent = max(1, max_concurrent)
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting: deque = deque()
+        self._inflight: dict[str, Future] = {}
+        self._coalesced = 0
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        """Current load, for health endpoints and logs."""
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "active": self._active,
+                "queued": len(self._waiting),
+                "inflight_keys": len(self._inflight),
+                "coalesced": self._coalesced,
+            }
+
+    def last_wait(self) -> tuple[float, bool]:
+        """
+        Seconds the calling thread's last request spent queued for a slot, and
+        whether it was coalesced into another caller's request instead.
+        """
+        return getattr(self._local, "wait", 0.0), getattr(self._local, "coalesced", False)
+
+    def _acquire(self, on_queue: Optional[QueueCallback] = None) -> bool:
+        """
+        Wait for a free slot, serving waiters strictly in arrival order.
+        on_queue is called outside the lock; returns whether the caller had to queue.
+        """
+        started = time.perf_counter()
+        ticket = object()
+        last_position = None
+        with self._cond:
+            self._waiting.append(ticket)
+        try:
+            while True:
+                with self._cond:
+                    if self._waiting[0] is ticket and self._active < self.max_concurrent:
+                        self._waiting.popleft()
+                        self._active += 1
+                        # The next waiter may also fit if more than one slot is free
+                        self._cond.notify_all()
+                        break
+                    position = self._waiting.index(ticket) + 1
+                if on_queue and position != last_position:
+                    on_queue(position)
+                    last_position = position
+                with self._cond:
+                    if self._waiting[0] is not ticket or self._active >= self.max_concurrent:
+                        self._cond.wait(self.poll_interval)
+        except BaseException:
+            with self._cond:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+            raise
+        self._local.wait = time.perf_counter() - started
+        return last_position is not None
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, on_queue: Optional[QueueCallback] = None):
+        """Hold one concurrency slot for the duration of the block (e.g. a stream)."""
+        self._local.coalesced = False
+        queued = self._acquire(on_queue)
+        try:
+            # Inside the try: UI callbacks may raise (e.g. Streamlit reruns) and must not leak the slot
+            if on_queue and queued:
+                on_queue(0)
+            yield
+        finally:
+            self._release()
+
+    def run(self, key: str, fn: Callable[[], T], on_queue: Optional[QueueCallback] = None) -> T:
+        """
+        Run fn under the concurrency cap.
+        Concurrent callers with the same key share the first caller's result. If the
+        first caller is interrupted rather than failing, the others retry themselves.
+        """
+        while True:
+            with self._cond:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self._inflight[key] = future
+                else:
+                    self._coalesced += 1
+
+            self._local.wait = 0.0
+            self._local.coalesced = not leader
+            if leader:
+                break
+            try:
+                return future.result()
+            except _LeaderInterrupted:
+                continue
+
+        error: Optional[BaseException] = _LeaderInterrupted()
+        try:
+            with self.slot(on_queue):
+                result = fn()
+            error = None
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Forget the key before waking followers, so retrying followers start a new call
+            with self._cond:
+                self._inflight.pop(key, None)
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller, sized by ELEVA_MAX_CONCURRENT_REQUESTS (default 4)."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                max_concurrent=int(os.getenv("ELEVA_MAX_CONCURRENT_REQUESTS", "4"))
+            )
+        return _controller
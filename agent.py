@@ -3,67 +3,157 @@ Eleva AI Data Room Agent
 Answers investor questions using the same structure and language as the data room.
 """
 
-import json
-import os
-import anthropic
-from notion_client_helper import NotionDataRoom
-from typing import Optional
+from admission import get_admission_controller, request_key
+from data_rooms import get_registry, get_snapshot_cache
+from grounding import check_answer
+from report_writer import ReportWriter, generate_report
+from typing import Callable, Iterator, Optional
 
 
 class ElevaDataRoomAgent:
     def __init__(
         self,
         anthropic_api_key: str,
-        notion_api_key: str,
-        notion_root_page_id: str,
+        notion_api_key: Optional[str] = None,
+        notion_root_page_id: Optional[str] = None,
         model: str = "claude-sonnet-4-20250514"
     ):
-        self.anthropic = anthropic.Anthropic(api_key=anthropic_api_key)
-        self.notion = NotionDataRoom(notion_api_key, notion_root_page_id)
+        # SDK clients are built on first use so cache-only runs never import them
+        self._anthropic_api_key = anthropic_api_key
+        self._notion_api_key = notion_api_key
+        self._anthropic = None
+        self._notion: dict = {}
         self.model = model
-        self._data_room_content: Optional[str] = None
-        self._cache_path = os.path.join(os.path.dirname(__file__), "data_room_cache.json")
-
-    def _load_from_cache(self) -> Optional[str]:
-        """Try to load data room content from the pre-built cache file."""
-        try:
-            if os.path.exists(self._cache_path):
-                with open(self._cache_path, "r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
-                content = cache_data.get("content")
-                if content:
-                    print(f"Loaded from cache ({cache_data.get('page_count', '?')} pages, updated: {cache_data.get('last_updated', 'unknown')})")
-                    return content
-        except Exception as e:
-            print(f"Cache load failed: {e}")
-        return None
-
-    def load_data_room(self, force_refresh: bool = False) -> str:
-        """Load data room content. Uses cache first, falls back to Notion API."""
-        if self._data_room_content and not force_refresh:
-            return self._data_room_content
+
+        # Requests without a room parameter go to this room. Unknown rooms raise KeyError
+        # rather than falling back to another room's snapshot: rooms separate investor tiers
+        self.rooms = get_registry()
+        self.default_room = self.rooms.resolve(notion_root_page_id).root_page_id
+
+    @property
+    def anthropic(self):
+        """Anthropic client, created on first model call."""
+        if self._anthropic is None:
+            import anthropic
+            self._anthropic = anthropic.Anthropic(api_key=self._anthropic_api_key)
+        return self._anthropic
+
+    def notion(self, room: Optional[str] = None):
+        """Notion client for a room, created only when content must be fetched from Notion."""
+        data_room = self.rooms.resolve(room or self.default_room)
+        if data_room.root_page_id not in self._notion:
+            if not self._notion_api_key:
+                raise RuntimeError("NOTION_API_KEY is required to fetch content from Notion")
+            from notion_client_helper import NotionDataRoom
+            self._notion[data_room.root_page_id] = NotionDataRoom(
+                self._notion_api_key, data_room.root_page_id,
+                database_cache_path=data_room.database_cache_path,
+                max_database_rows=data_room.max_database_rows
+            )
+        return self._notion[data_room.root_page_id]
+
+    def load_data_room(self, force_refresh: bool = False, room: Optional[str] = None) -> str:
+        """
+        Load a data room's content. Uses the shared snapshot cache first, falls back to Notion API.
+        room is a root page id or slug from data_rooms.json; None means the default room.
+        """
+        data_room = self.rooms.resolve(room or self.default_room)
+        snapshots = get_snapshot_cache()
 
         # Try cache first (instant)
         if not force_refresh:
-            cached = self._load_from_cache()
+            cached = snapshots.get(data_room)
             if cached:
-                self._data_room_content = cached
-                return self._data_room_content
+                return cached
 
         # Fallback to Notion API (slow)
+        notion = self.notion(data_room.root_page_id)
         if force_refresh:
-            self.notion.clear_cache()
+            notion.clear_cache()
 
-        self._data_room_content = self.notion.get_full_data_room_content()
-        return self._data_room_content
+        content = notion.get_full_data_room_content()
+        notion.save_database_cache()
+        snapshots.put(data_room, content)
+        return content
 
-    def answer_question(self, question: str, context: Optional[str] = None) -> str:
+    def check_grounding(self, text: str, room: Optional[str] = None) -> list[dict]:
         """
-        Answer a question based on the data room content.
-        Uses the same structure and language as the data room.
+        Check the figures, quotes and cited sections in a response against the room's
+        snapshot. Returns one dict per claim; see grounding.unsupported / format_flags.
+        """
+        data_room = self.rooms.resolve(room or self.default_room)
+        return check_answer(data_room, text, content=get_snapshot_cache().get(data_room))
+
+    def _complete(self, system_prompt: str, user_message: str, max_tokens: int) -> str:
+        """
+        Send one request to Claude through the process-wide admission controller.
+        Identical concurrent requests share a single upstream call.
+        """
+        def call() -> str:
+            response = self.anthropic.messages.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                system=system_prompt,
+                messages=[
+                    {"role": "user", "content": user_message}
+                ]
+            )
+            return response.content[0].text
+
+        key = request_key(self.model, str(max_tokens), system_prompt, user_message)
+        return get_admission_controller().run(key, call)
+
+    def _stream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        max_tokens: int,
+        prefill: Optional[str] = None,
+        result: Optional[dict] = None
+    ) -> Iterator[str]:
         """
-        if not self._data_room_content:
-            self.load_data_room()
+        Stream one request to Claude, yielding text as it arrives.
+        Holds an admission slot for the whole stream; streams are never coalesced.
+        prefill continues a partial assistant response; result receives the stop_reason.
+        """
+        messages = [{"role": "user", "content": user_message}]
+        if prefill:
+            messages.append({"role": "assistant", "content": prefill})
+
+        with get_admission_controller().slot():
+            with self.anthropic.messages.stream(
+                model=self.model,
+                max_tokens=max_tokens,
+                system=system_prompt,
+                messages=messages
+            ) as stream:
+                yield from stream.text_stream
+                if result is not None:
+                    result["stop_reason"] = stream.get_final_message().stop_reason
+
+    def _write_report(
+        self,
+        writer: ReportWriter,
+        request: tuple[str, str, int],
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> ReportWriter:
+        """Stream a request into writer, resuming a matching partial and continuing past max_tokens."""
+        system_prompt, user_message, max_tokens = request
+        writer.begin(request_key(self.model, str(max_tokens), system_prompt, user_message))
+
+        def segment(prefill, message, result):
+            return self._stream(system_prompt, message, max_tokens, prefill, result)
+
+        return generate_report(writer, segment, user_message, on_chunk=on_chunk)
+
+    def _answer_request(
+        self,
+        question: str,
+        context: Optional[str] = None,
+        room: Optional[str] = None
+    ) -> tuple[str, str, int]:
+        """Build the (system prompt, user message, max tokens) for a single question."""
+        content = self.load_data_room(room=room)
 
         system_prompt = """You are the Eleva AI Data Room Assistant. Your role is to help the CEO
 quickly answer investor questions by providing accurate, professional responses based on the
@@ -92,7 +182,7 @@ CRITICAL GUIDELINES:
 You have access to the complete Eleva AI Data Room content below."""
 
         user_message = f"""DATA ROOM CONTENT:
-{self._data_room_content}
+{content}
 
 ---
 
@@ -104,28 +194,17 @@ INVESTOR QUESTION:
 Please provide a professional response based on the data room content. Use the same language
 and structure as the data room documents."""
 
-        response = self.anthropic.messages.create(
-            model=self.model,
-            max_tokens=4096,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_message}
-            ]
-        )
-
-        return response.content[0].text
+        return system_prompt, user_message, 4096
 
-    def generate_document(
+    def _document_request(
         self,
         questions: list[str],
         document_title: str = "Investor Q&A Response",
-        include_intro: bool = True
-    ) -> str:
-        """
-        Generate a formal document answering multiple investor questions.
-        """
-        if not self._data_room_content:
-            self.load_data_room()
+        include_intro: bool = True,
+        room: Optional[str] = None
+    ) -> tuple[str, str, int]:
+        """Build the request for a formal document answering a list of questions."""
+        content = self.load_data_room(room=room)
 
         questions_formatted = "\n".join(f"{i+1}. {q}" for i, q in enumerate(questions))
 
@@ -136,7 +215,7 @@ answer investor questions using the exact language, terminology, and style from
 Your output should be a complete, polished document ready to send to investors."""
 
         user_message = f"""DATA ROOM CONTENT:
-{self._data_room_content}
+{content}
 
 ---
 
@@ -155,28 +234,16 @@ Please generate a professional document that:
 
 Format the document in Markdown for easy conversion to other formats."""
 
-        response = self.anthropic.messages.create(
-            model=self.model,
-            max_tokens=8192,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_message}
-            ]
-        )
-
-        return response.content[0].text
+        return system_prompt, user_message, 8192
 
-    def generate_document_from_text(
+    def _document_from_text_request(
         self,
         questions_text: str,
-        document_title: str = "Investor Q&A Response"
-    ) -> str:
-        """
-        Generate a formal document from a raw text block containing questions.
-        The model will interpret categories, questions, and structure automatically.
-        """
-        if not self._data_room_content:
-            self.load_data_room()
+        document_title: str = "Investor Q&A Response",
+        room: Optional[str] = None
+    ) -> tuple[str, str, int]:
+        """Build the request for a formal document from a raw block of questions."""
+        content = self.load_data_room(room=room)
 
         system_prompt = """You are the Eleva AI Data Room Assistant helping the CEO prepare
 formal investor communication documents.
@@ -206,7 +273,7 @@ CRITICAL GUIDELINES:
 Your output should be a complete, polished document in Markdown format."""
 
         user_message = f"""DATA ROOM CONTENT:
-{self._data_room_content}
+{content}
 
 ---
 
@@ -222,32 +289,112 @@ Generate a professional investor document that addresses all the questions above
 preserving the category structure if present. Use the same language and terminology
 as the data room."""
 
-        response = self.anthropic.messages.create(
-            model=self.model,
-            max_tokens=8192,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_message}
-            ]
-        )
+        return system_prompt, user_message, 8192
 
-        return response.content[0].text
-
-    def get_data_room_summary(self) -> str:
-        """Get a summary of the data room structure and contents."""
-        if not self._data_room_content:
-            self.load_data_room()
+    def _summary_request(self, room: Optional[str] = None) -> tuple[str, str, int]:
+        """Build the request for a summary of the data room structure."""
+        content = self.load_data_room(room=room)
 
         system_prompt = """Provide a brief executive summary of the data room's structure
 and key content areas. List the main sections and what information each contains."""
 
-        response = self.anthropic.messages.create(
-            model=self.model,
-            max_tokens=2048,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": f"Summarize this data room:\n\n{self._data_room_content}"}
-            ]
-        )
+        return system_prompt, f"Summarize this data room:\n\n{content}", 2048
+
+    def answer_question(self, question: str, context: Optional[str] = None, room: Optional[str] = None) -> str:
+        """
+        Answer a question based on the data room content.
+        Uses the same structure and language as the data room.
+        """
+        return self._complete(*self._answer_request(question, context, room))
 
-        return response.content[0].text
+    def generate_document(
+        self,
+        questions: list[str],
+        document_title: str = "Investor Q&A Response",
+        include_intro: bool = True,
+        room: Optional[str] = None
+    ) -> str:
+        """
+        Generate a formal document answering multiple investor questions.
+        """
+        return self._complete(*self._document_request(questions, document_title, include_intro, room))
+
+    def generate_document_from_text(
+        self,
+        questions_text: str,
+        document_title: str = "Investor Q&A Response",
+        room: Optional[str] = None
+    ) -> str:
+        """
+        Generate a formal document from a raw text block containing questions.
+        The model will interpret categories, questions, and structure automatically.
+        """
+        return self._complete(*self._document_from_text_request(questions_text, document_title, room))
+
+    def get_data_room_summary(self, room: Optional[str] = None) -> str:
+        """Get a summary of the data room structure and contents."""
+        return self._complete(*self._summary_request(room))
+
+    # ── Streaming variants: yield text chunks as they arrive ──
+
+    def stream_answer(
+        self,
+        question: str,
+        context: Optional[str] = None,
+        room: Optional[str] = None
+    ) -> Iterator[str]:
+        """Stream the answer to a question, chunk by chunk."""
+        return self._stream(*self._answer_request(question, context, room))
+
+    def stream_document(
+        self,
+        questions: list[str],
+        document_title: str = "Investor Q&A Response",
+        include_intro: bool = True,
+        room: Optional[str] = None
+    ) -> Iterator[str]:
+        """Stream a formal document answering multiple investor questions."""
+        return self._stream(*self._document_request(questions, document_title, include_intro, room))
+
+    def stream_document_from_text(
+        self,
+        questions_text: str,
+        document_title: str = "Investor Q&A Response",
+        room: Optional[str] = None
+    ) -> Iterator[str]:
+        """Stream a formal document generated from a raw block of questions."""
+        return self._stream(*self._document_from_text_request(questions_text, document_title, room))
+
+    def stream_data_room_summary(self, room: Optional[str] = None) -> Iterator[str]:
+        """Stream a summary of the data room structure and contents."""
+        return self._stream(*self._summary_request(room))
+
+    # ── Incremental report writing: stream into a ReportWriter as sections arrive ──
+
+    def write_document(
+        self,
+        writer: ReportWriter,
+        questions: list[str],
+        document_title: str = "Investor Q&A Response",
+        include_intro: bool = True,
+        room: Optional[str] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> ReportWriter:
+        """
+        Generate a formal document into writer, flushing progressively.
+        Resumes an interrupted partial of the same request and continues past max_tokens.
+        """
+        request = self._document_request(questions, document_title, include_intro, room)
+        return self._write_report(writer, request, on_chunk)
+
+    def write_document_from_text(
+        self,
+        writer: ReportWriter,
+        questions_text: str,
+        document_title: str = "Investor Q&A Response",
+        room: Optional[str] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> ReportWriter:
+        """Generate a document from a raw block of questions into writer (see write_document)."""
+        request = self._document_from_text_request(questions_text, document_title, room)
+        return self._write_report(writer, request, on_chunk)
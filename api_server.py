@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Eleva AI Data Room Agent - HTTP API
+Lightweight async JSON service over ElevaDataRoomAgent, with Server-Sent Events
+streaming, so CRM and email tools can call the agent without spawning processes.
+
+Endpoints:
+    POST /answer              {"question": ..., "context": ..., "stream": false}
+    POST /document            {"questions": [...], "title": ..., "include_intro": true, "stream": false}
+    POST /document_from_text  {"questions_text": ..., "title": ..., "stream": false}
+    POST /summary             {"stream": false}
+    GET  /health              status, snapshot info and per-worker metrics
+
+Send "stream": true (or "Accept: text/event-stream") to receive the response as SSE
+"chunk" events followed by a single "done" event. Add "room" (slug or root page id from
+data_rooms.json) to any body to target a specific data room.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from admission import get_admission_controller
+from agent import ElevaDataRoomAgent
+from data_rooms import get_snapshot_cache
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Metrics:
+    """Per-worker request counters, reported by /health."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.in_flight = 0
+        self.requests: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.latency_total: dict[str, float] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        self.latency_total[endpoint] = self.latency_total.get(endpoint, 0.0) + seconds
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_seconds": {
+                name: round(total / self.requests[name], 3)
+                for name, total in self.latency_total.items()
+            },
+        }
+
+
+def _require(body: dict, field: str, kind: type):
+    value = body.get(field)
+    if not isinstance(value, kind) or not value:
+        raise HTTPError(400, f"'{field}' is required")
+    return value
+
+
+class DataRoomAPI:
+    def __init__(self, agent: ElevaDataRoomAgent, threads: int = 16, api_token: str = None):
+        self.agent = agent
+        self.api_token = api_token
+        self.metrics = Metrics()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="agent")
+
+    def _route(self, path: str, body: dict):
+        """Map an endpoint to (blocking call, streaming call) on the agent."""
+        room = body.get("room")
+        if room is not None and (not isinstance(room, str) or self.agent.rooms.find(room) is None):
+            raise HTTPError(404, f"Unknown data room {room}")
+
+        if path == "/answer":
+            args = (_require(body, "question", str), body.get("context"), room)
+            return (
+                lambda: self.agent.answer_question(*args),
+                lambda: self.agent.stream_answer(*args),
+            )
+        if path == "/document":
+            args = (
+                _require(body, "questions", list),
+                body.get("title", "Investor Q&A Response"),
+                bool(body.get("include_intro", True)),
+                room,
+            )
+            return (
+                lambda: self.agent.generate_document(*args),
+                lambda: self.agent.stream_document(*args),
+            )
+        if path == "/document_from_text":
+            args = (
+                _require(body, "questions_text", str),
+                body.get("title", "Investor Q&A Response"),
+                room,
+            )
+            return (
+                lambda: self.agent.generate_document_from_text(*args),
+                lambda: self.agent.stream_document_from_text(*args),
+            )
+        if path == "/summary":
+            return (
+                lambda: self.agent.get_data_room_summary(room),
+                lambda: self.agent.stream_data_room_summary(room),
+            )
+        raise HTTPError(404, f"Unknown endpoint {path}")
+
+    def health(self) -> dict:
+        default_room = self.agent.rooms.resolve(self.agent.default_room)
+        return {
+            "status": "ok" if os.path.exists(default_room.snapshot_path) else "degraded",
+            "pid": os.getpid(),
+            "rooms": [room.slug for room in self.agent.rooms.rooms()],
+            "snapshots": get_snapshot_cache().stats(),
+            "admission": get_admission_controller().stats(),
+            "metrics": self.metrics.to_dict(),
+        }
+
+    # ── HTTP plumbing ──
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                request = await self._read_request(reader, writer)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                keep_alive = await self._dispatch(method, path, headers, body, writer) and keep_alive
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        # readline raises ValueError for lines over the stream limit (64 KiB)
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            await self._send_json(writer, 400, {"error": "Request line too long"}, keep_alive=False)
+            return None
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            await self._send_json(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+            return None
+
+        headers = {}
+        for count in range(MAX_HEADERS + 1):
+            try:
+                line = await reader.readline()
+            except ValueError:
+                line = None
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if line is None or count == MAX_HEADERS:
+                await self._send_json(writer, 431, {"error": "Request headers too large"}, keep_alive=False)
+                return None
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._send_json(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+            return None
+        if length > MAX_BODY_BYTES:
+            await self._send_json(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+            return None
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method, path, headers, raw_body, writer) -> bool:
+        """Handle one request. Returns False when the connection must be closed."""
+        if path == "/health" and method == "GET":
+            await self._send_json(writer, 200, self.health())
+            return True
+
+        started = time.perf_counter()
+        self.metrics.in_flight += 1
+        ok = False
+        try:
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            if self.api_token and headers.get("authorization") != f"Bearer {self.api_token}":
+                raise HTTPError(401, "Invalid or missing bearer token")
+            try:
+                body = json.loads(raw_body or b"{}")
+            except json.JSONDecodeError:
+                raise HTTPError(400, "Body must be JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Body must be a JSON object")
+
+            call, stream_call = self._route(path, body)
+            wants_stream = body.get("stream") or "text/event-stream" in headers.get("accept", "")
+
+            if wants_stream:
+                ok = await self._send_stream(writer, stream_call)
+                return False
+
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(self.executor, call)
+            await self._send_json(writer, 200, {"response": text})
+            ok = True
+            return True
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {"error": e.message})
+            return True
+        except ConnectionError:
+            raise
+        except Exception as e:
+            print(f"Error handling {path}: {e}")
+            await self._send_json(writer, 500, {"error": "Unable to generate response"})
+            return True
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.record(path, time.perf_counter() - started, ok)
+
+    async def _send_json(self, writer, status: int, payload: dict, keep_alive: bool = True):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_stream(self, writer, stream_call) -> bool:
+        """Relay a blocking chunk generator to the client as Server-Sent Events."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def produce():
+            chunks = None
+            try:
+                # Inside the try: building the request (e.g. loading the room) can fail too
+                chunks = stream_call()
+                for chunk in chunks:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                # Closing the generator releases the upstream stream and admission slot
+                if chunks is not None:
+                    chunks.close()
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        await writer.drain()
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    writer.write(b"event: done\ndata: {}\n\n")
+                    await writer.drain()
+                    return True
+                if isinstance(item, Exception):
+                    print(f"Stream error: {item}")
+                    writer.write(b'event: error\ndata: {"error": "Unable to generate response"}\n\n')
+                    await writer.drain()
+                    return False
+                data = json.dumps({"text": item}, ensure_ascii=False)
+                writer.write(f"event: chunk\ndata: {data}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            cancelled.set()
+            await producer
+
+
+async def _serve(api: DataRoomAPI, sock: socket.socket):
+    server = await asyncio.start_server(api.handle_connection, sock=sock)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with server:
+        await stop.wait()
+
+
+def _run_workers(api: DataRoomAPI, sock: socket.socket, workers: int):
+    """Fork worker processes that share the listening socket."""
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                asyncio.run(_serve(api, sock))
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def shutdown(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Eleva AI Data Room Agent - HTTP API")
+    parser.add_argument("--host", default=os.getenv("ELEVA_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("ELEVA_API_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ELEVA_API_WORKERS", "1")),
+                        help="Worker processes sharing the port")
+    parser.add_argument("--threads", type=int, default=16,
+                        help="Agent threads per worker")
+    args = parser.parse_args()
+
+    anthropic_key = os.getenv("ANTHROPIC_API_KEY")
+    if not anthropic_key:
+        print("Error: ANTHROPIC_API_KEY not set")
+        sys.exit(1)
+
+    agent = ElevaDataRoomAgent(
+        anthropic_api_key=anthropic_key,
+        notion_api_key=os.getenv("NOTION_API_KEY"),
+        notion_root_page_id=os.getenv("NOTION_ROOT_PAGE_ID")
+    )
+    # Load the default room before forking so workers share it copy-on-write;
+    # other rooms are loaded on demand into each worker's snapshot LRU
+    agent.load_data_room()
+    api = DataRoomAPI(agent, threads=args.threads, api_token=os.getenv("ELEVA_API_TOKEN"))
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(512)
+    sock.setblocking(False)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+
+    if args.workers > 1:
+        _run_workers(api, sock, args.workers)
+    else:
+        asyncio.run(_serve(api, sock))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,22 @@
 Eleva AI - Investor Data Room Assistant
 """
 
-import json
 import streamlit as st
 from dotenv import load_dotenv
 import os
 import base64
-import anthropic
+import tempfile
+import time
+
+import portal
+from data_rooms import get_registry, get_snapshot_cache
+from grounding import check_answer, format_flags
+from portal import SYSTEM_DOC, SYSTEM_QA, qa_message, report_message
+from report_writer import ReportWriter
 
 load_dotenv()
 
-# ── Load data room content at module level (runs once on import) ──
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
-CACHE_PATH = os.path.join(APP_DIR, "data_room_cache.json")
-
-DATA_ROOM_CONTENT = ""
-try:
-    with open(CACHE_PATH, "r", encoding="utf-8") as f:
-        DATA_ROOM_CONTENT = json.load(f).get("content", "")
-except Exception:
-    DATA_ROOM_CONTENT = ""
 
 # ── Load logo at module level ──
 LOGO_BASE64 = None
@@ -39,48 +36,28 @@ def _get_anthropic_key():
         return os.getenv("ANTHROPIC_API_KEY")
 
 # ── Claude call helper ──
-def ask_claude(system_prompt: str, user_message: str, max_tokens: int = 4096) -> str:
-    key = _get_anthropic_key()
-    if not key:
-        return "Service temporarily unavailable."
-    client = anthropic.Anthropic(api_key=key)
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=max_tokens,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_message}]
-    )
-    return response.content[0].text
-
-
-SYSTEM_QA = """You are the Eleva AI Data Room Assistant. Your role is to help investors
-get accurate answers based on the company's official data room documentation.
-
-GUIDELINES:
-1. Use the exact terminology, phrasing, and tone from the data room.
-2. Structure responses clearly with headings, bullet points, and lists.
-3. Only include information explicitly stated in or directly inferred from the data room.
-4. When relevant, reference which section the information comes from.
-5. Maintain a confident, professional tone appropriate for investor relations.
-6. If information is missing, clearly state what is available and what would need to be addressed separately.
-
-You have access to the complete Eleva AI Data Room content below."""
+def ask_claude(system_prompt: str, user_message: str, max_tokens: int = 4096, on_queue=None) -> str:
+    return portal.ask_claude(_get_anthropic_key(), system_prompt, user_message, max_tokens, on_queue=on_queue)
 
-SYSTEM_DOC = """You are the Eleva AI Data Room Assistant generating formal investor documents.
 
-Your task is to:
-1. Parse the provided text to identify all questions (they may be organized by categories)
-2. Answer each question using ONLY information from the data room
-3. Generate a professional, well-structured document ready to send to investors
+def _grounding_notice(claims: list, placeholder=None):
+    """
+    Flag figures, quotes and section names that the data room doesn't support.
+    With a placeholder, the warning replaces its contents, so it can grow as a report streams.
+    """
+    flags = format_flags(claims)
+    if flags:
+        (placeholder or st).warning("Some details below could not be verified against the data room:\n\n" + flags)
 
-GUIDELINES:
-- Preserve the category structure if questions are organized by sections.
-- Use the exact terminology and tone from the data room.
-- Only include information explicitly stated in the data room.
-- Maintain a confident, professional tone.
-- If information is missing, note that additional details can be provided upon request.
 
-Output a complete, polished document in Markdown format."""
+def _queue_notice(placeholder):
+    """Show the visitor's place in line while their request waits for a slot."""
+    def update(position: int):
+        if position:
+            placeholder.info(f"High demand right now — you are #{position} in the queue.")
+        else:
+            placeholder.empty()
+    return update
 
 
 # ── Page config ──
@@ -158,7 +135,10 @@ st.markdown(f"""
 """, unsafe_allow_html=True)
 
 
-# ── Check data is loaded ──
+# ── Resolve the data room (?room=<slug>) and load it from the shared snapshot cache ──
+data_room = get_registry().find(st.query_params.get("room"))
+DATA_ROOM_CONTENT = get_snapshot_cache().get(data_room) if data_room else None
+
 if not DATA_ROOM_CONTENT:
     st.error("Data room content is not available. Please try again later.")
     st.stop()
@@ -186,14 +166,17 @@ with tab1:
 
     if st.button("Get Answer", type="primary", use_container_width=True):
         if question:
+            queue_placeholder = st.empty()
             with st.spinner("Analyzing your question..."):
                 try:
                     response = ask_claude(
                         SYSTEM_QA,
-                        f"DATA ROOM CONTENT:\n{DATA_ROOM_CONTENT}\n\n---\n\nINVESTOR QUESTION:\n{question}\n\nProvide a professional response based on the data room content.",
+                        qa_message(DATA_ROOM_CONTENT, question),
+                        on_queue=_queue_notice(queue_placeholder),
                     )
                     st.markdown("---")
                     st.markdown("### Answer")
+                    _grounding_notice(check_answer(data_room, response, content=DATA_ROOM_CONTENT))
                     st.markdown(response)
                     st.download_button(
                         "📥 Download Response", response,
@@ -240,24 +223,65 @@ TEAM & VISION
     st.markdown('<div class="time-info">Comprehensive reports typically take 1-2 minutes</div>', unsafe_allow_html=True)
 
     if st.button("Generate Report", type="primary", use_container_width=True, key="generate"):
-        if questions_text.strip():
-            with st.spinner("Generating your comprehensive report..."):
-                try:
-                    document = ask_claude(
-                        SYSTEM_DOC,
-                        f"DATA ROOM CONTENT:\n{DATA_ROOM_CONTENT}\n\n---\n\nDOCUMENT REQUEST:\nTitle: {doc_title}\n\nQUESTIONS:\n{questions_text}\n\nGenerate a professional investor document addressing all questions, preserving category structure.",
-                        max_tokens=8192
-                    )
-                    st.markdown("---")
-                    st.markdown("### Your Report")
-                    st.markdown(document)
-                    st.download_button(
-                        "📥 Download Report", document,
-                        file_name=f"{doc_title.replace(' ', '_')}.md", mime="text/markdown",
-                        use_container_width=True
-                    )
-                except Exception:
-                    st.error("Unable to generate report. Please try again.")
+        api_key = _get_anthropic_key()
+        if not api_key:
+            st.error("Service temporarily unavailable.")
+        elif questions_text.strip():
+            queue_placeholder = st.empty()
+            st.markdown("---")
+            st.markdown("### Your Report")
+            # Above the report, filled in as each streamed block is checked
+            notice = st.empty()
+            report_area = st.container()
+            # Reports stream to a temp file, not memory; the download reads it from disk
+            fd, report_path = tempfile.mkstemp(prefix="eleva-report-", suffix=".md")
+            os.close(fd)
+            writer = ReportWriter(report_path)
+            preview = {"pending": "", "shown": 0.0}
+            claims = []
+
+            def render_pending(final: bool = False):
+                # Append only the new complete Markdown blocks, checking each as it's shown
+                text = preview["pending"]
+                cut = len(text) if final else text.rfind("\n\n")
+                if cut <= 0:
+                    return
+                block, preview["pending"] = text[:cut], text[cut:]
+                if block.strip():
+                    report_area.markdown(block)
+                    claims.extend(check_answer(data_room, block, content=DATA_ROOM_CONTENT))
+                    _grounding_notice(claims, notice)
+
+            def show_progress(chunk: str):
+                preview["pending"] += chunk
+                # Render at most twice a second while sections stream in
+                if time.monotonic() - preview["shown"] >= 0.5:
+                    render_pending()
+                    preview["shown"] = time.monotonic()
+
+            try:
+                with st.spinner("Generating your comprehensive report..."):
+                    try:
+                        portal.write_report(
+                            api_key, writer, SYSTEM_DOC,
+                            report_message(DATA_ROOM_CONTENT, doc_title, questions_text),
+                            max_tokens=8192,
+                            on_chunk=show_progress,
+                            on_queue=_queue_notice(queue_placeholder),
+                        )
+                    except Exception:
+                        st.error("Unable to finish the report. The partial report below can still be downloaded.")
+                render_pending(final=True)
+
+                if writer.bytes_written:
+                    with writer.reader() as report_file:
+                        st.download_button(
+                            "📥 Download Report", report_file,
+                            file_name=f"{doc_title.replace(' ', '_')}.md", mime="text/markdown",
+                            use_container_width=True
+                        )
+            finally:
+                writer.discard()
         else:
             st.warning("Please paste your questions above.")
 
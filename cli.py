@@ -9,12 +9,23 @@ import os
 import sys
 from dotenv import load_dotenv
 
-from agent import ElevaDataRoomAgent
 
+def print_grounding_flags(agent, text, room=None):
+    """
+    Warn about figures, quotes and cited sections that the data room doesn't support.
+    text is a string or an iterable of blocks (e.g. ReportWriter.blocks(), so long
+    reports are checked without loading them whole).
+    """
+    from grounding import format_flags
 
-def main():
-    load_dotenv()
+    blocks = [text] if isinstance(text, str) else text
+    flags = format_flags([claim for block in blocks for claim in agent.check_grounding(block, room=room)])
+    if flags:
+        print("\n⚠ Not verified against the data room - review before sending:")
+        print(flags)
 
+
+def main():
     parser = argparse.ArgumentParser(
         description="Eleva AI Data Room Agent - Answer investor questions"
     )
@@ -36,6 +47,19 @@ def main():
         action="store_true",
         help="Show data room summary instead of answering a question"
     )
+    parser.add_argument(
+        "--questions-file",
+        help="Generate a due diligence report answering the questions in this file"
+    )
+    parser.add_argument(
+        "--title",
+        default="Investor Q&A Response",
+        help="Report title (with --questions-file)"
+    )
+    parser.add_argument(
+        "--room",
+        help="Data room slug or root page id from data_rooms.json (default room if omitted)"
+    )
     parser.add_argument(
         "--refresh",
         action="store_true",
@@ -43,16 +67,25 @@ def main():
     )
 
     args = parser.parse_args()
+    load_dotenv()
 
     # Check for API keys
     notion_key = os.getenv("NOTION_API_KEY")
     anthropic_key = os.getenv("ANTHROPIC_API_KEY")
-    page_id = os.getenv("NOTION_ROOT_PAGE_ID", "1c978b84590d80d48509e1585e9ff849")
+    page_id = os.getenv("NOTION_ROOT_PAGE_ID")
+
+    if not anthropic_key:
+        print("Error: Missing API key. Set ANTHROPIC_API_KEY in .env")
+        sys.exit(1)
 
-    if not notion_key or not anthropic_key:
-        print("Error: Missing API keys. Set NOTION_API_KEY and ANTHROPIC_API_KEY in .env")
+    # Notion is only contacted on --refresh; otherwise data_room_cache.json is enough
+    if args.refresh and not notion_key:
+        print("Error: --refresh requires NOTION_API_KEY in .env")
         sys.exit(1)
 
+    # Deferred so --help and argument errors never pay for the SDK imports
+    from agent import ElevaDataRoomAgent
+
     # Initialize agent
     print("Initializing agent...")
     agent = ElevaDataRoomAgent(
@@ -61,15 +94,40 @@ def main():
         notion_root_page_id=page_id
     )
 
-    print("Loading data room content...")
-    agent.load_data_room(force_refresh=args.refresh)
-
-    if args.summary:
+    # The cached snapshot is parsed on first use; only --refresh forces a Notion crawl
+    if args.refresh:
+        print("Refreshing data room content from Notion...")
+        agent.load_data_room(force_refresh=True, room=args.room)
+
+    if args.questions_file:
+        from report_writer import ReportWriter
+
+        with open(args.questions_file, "r", encoding="utf-8") as f:
+            questions_text = f.read()
+
+        # Stream sections to the terminal and flush them to -o as they arrive;
+        # rerunning the same command after an interruption resumes the partial file
+        print(f"\n--- {args.title} ---\n")
+        writer = ReportWriter(args.output)
+        try:
+            agent.write_document_from_text(
+                writer, questions_text, args.title, room=args.room,
+                on_chunk=lambda chunk: print(chunk, end="", flush=True)
+            )
+            print()
+            print_grounding_flags(agent, writer.blocks(), room=args.room)
+        finally:
+            writer.close()
+        if args.output:
+            status = "Saved" if writer.complete else "Partial report saved (rerun to resume)"
+            print(f"\n{status} to {args.output}")
+        return
+    elif args.summary:
         print("\n--- Data Room Summary ---\n")
-        response = agent.get_data_room_summary()
+        response = agent.get_data_room_summary(room=args.room)
     elif args.question:
         print(f"\n--- Answering: {args.question} ---\n")
-        response = agent.answer_question(args.question, args.context)
+        response = agent.answer_question(args.question, args.context, room=args.room)
     else:
         # Interactive mode
         print("\nEleva AI Data Room Agent - Interactive Mode")
@@ -82,9 +140,12 @@ def main():
                 if question.lower() == 'quit':
                     break
                 elif question.lower() == 'summary':
-                    print("\n" + agent.get_data_room_summary() + "\n")
+                    print("\n" + agent.get_data_room_summary(room=args.room) + "\n")
                 elif question:
-                    print("\n" + agent.answer_question(question) + "\n")
+                    answer = agent.answer_question(question, room=args.room)
+                    print("\n" + answer)
+                    print_grounding_flags(agent, answer, room=args.room)
+                    print()
 
             except KeyboardInterrupt:
                 print("\nGoodbye!")
@@ -93,6 +154,7 @@ def main():
         return
 
     print(response)
+    print_grounding_flags(agent, response, room=args.room)
 
     if args.output:
         with open(args.output, "w") as f:
@@ -0,0 +1,244 @@
+"""
+Data room registry and shared snapshot cache.
+Each data room is a Notion root page with its own snapshot file and refresh schedule.
+Loaded snapshots live in one memory-bounded LRU shared by the app, the agent and the API.
+"""
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_PATH = os.path.join(APP_DIR, "data_rooms.json")
+DEFAULT_ROOT_PAGE_ID = "1c978b84590d80d48509e1585e9ff849"
+DEFAULT_SNAPSHOT = "data_room_cache.json"
+
+
+def normalize_page_id(page_id: str) -> str:
+    """Notion ids appear with and without dashes; compare them without."""
+    return page_id.replace("-", "").lower()
+
+
+class DataRoom:
+    def __init__(
+        self,
+        slug: str,
+        root_page_id: str,
+        snapshot: str = DEFAULT_SNAPSHOT,
+        name: Optional[str] = None,
+        refresh_interval_hours: float = 24,
+        database_cache: Optional[str] = None,
+        changelog: Optional[str] = None,
+        grounding_index: Optional[str] = None,
+        max_database_rows: Optional[int] = None
+    ):
+        self.slug = slug
+        self.root_page_id = normalize_page_id(root_page_id)
+        self.name = name or slug
+        self.refresh_interval_hours = refresh_interval_hours
+        # Optional cap on rendered rows per child database (None renders every row)
+        self.max_database_rows = max_database_rows
+        self.snapshot_path = os.path.join(APP_DIR, snapshot)
+        if database_cache is None:
+            stem, _ = os.path.splitext(snapshot)
+            database_cache = "database_cache.json" if snapshot == DEFAULT_SNAPSHOT else f"{stem}.databases.json"
+        self.database_cache_path = os.path.join(APP_DIR, database_cache)
+        if changelog is None:
+            stem, _ = os.path.splitext(snapshot)
+            changelog = "data_room_changelog.md" if snapshot == DEFAULT_SNAPSHOT else f"{stem}.changelog.md"
+        self.changelog_path = os.path.join(APP_DIR, changelog)
+        if grounding_index is None:
+            stem, _ = os.path.splitext(snapshot)
+            grounding_index = "data_room_grounding.json" if snapshot == DEFAULT_SNAPSHOT else f"{stem}.grounding.json"
+        self.grounding_path = os.path.join(APP_DIR, grounding_index)
+
+    def last_updated(self) -> Optional[datetime]:
+        """When the snapshot on disk was last refreshed, if it exists."""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return datetime.fromisoformat(json.load(f)["last_updated"])
+        except Exception:
+            return None
+
+    def is_due(self, now: Optional[datetime] = None) -> bool:
+        """Whether the snapshot is older than this room's refresh interval."""
+        updated = self.last_updated()
+        if updated is None:
+            return True
+        now = now or datetime.now(timezone.utc)
+        # Ten minutes of slack so an hourly scheduler doesn't skip a run by seconds
+        return (now - updated).total_seconds() >= self.refresh_interval_hours * 3600 - 600
+
+
+class DataRoomRegistry:
+    def __init__(self, rooms: list[DataRoom], default: Optional[str] = None):
+        self._rooms: dict[str, DataRoom] = {}
+        self._slugs: dict[str, str] = {}
+        for room in rooms:
+            self.register(room)
+        self.default_id = self.resolve(default).root_page_id if default else rooms[0].root_page_id
+
+    def register(self, room: DataRoom):
+        self._rooms[room.root_page_id] = room
+        self._slugs[room.slug] = room.root_page_id
+
+    def rooms(self) -> list[DataRoom]:
+        return list(self._rooms.values())
+
+    def find(self, key: Optional[str]) -> Optional[DataRoom]:
+        """Look up a room by root page id or slug; None means the default room."""
+        if not key:
+            return self._rooms[self.default_id]
+        root_id = self._slugs.get(key) or normalize_page_id(key)
+        return self._rooms.get(root_id)
+
+    def resolve(self, key: Optional[str]) -> DataRoom:
+        room = self.find(key)
+        if room is None:
+            raise KeyError(f"Unknown data room: {key}")
+        return room
+
+
+def load_registry(path: str = REGISTRY_PATH) -> DataRoomRegistry:
+    """
+    Load data_rooms.json. Without it, the registry holds a single room for
+    NOTION_ROOT_PAGE_ID backed by data_room_cache.json.
+    """
+    if not os.path.exists(path):
+        root_page_id = os.getenv("NOTION_ROOT_PAGE_ID") or DEFAULT_ROOT_PAGE_ID
+        return DataRoomRegistry([DataRoom("default", root_page_id)])
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    rooms = [DataRoom(**entry) for entry in config["rooms"]]
+    return DataRoomRegistry(rooms, default=config.get("default"))
+
+
+class SnapshotCache:
+    """
+    LRU of loaded snapshot contents, bounded by total memory.
+    Snapshots are reloaded when their file changes on disk, so refreshed rooms
+    are picked up without a restart while hot rooms stay in memory. Objects derived
+    from a snapshot (e.g. its grounding index) live in the same entry: they count
+    against the bound and are dropped when the snapshot is reloaded or evicted.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _mtime(self, room: DataRoom) -> Optional[float]:
+        try:
+            return os.stat(room.snapshot_path).st_mtime
+        except OSError:
+            return None
+
+    def get(self, room: DataRoom) -> Optional[str]:
+        """Content of a room's snapshot, or None if it has not been built yet."""
+        mtime = self._mtime(room)
+        with self._lock:
+            entry = self._entries.get(room.root_page_id)
+            if entry and entry["mtime"] == mtime:
+                self._entries.move_to_end(room.root_page_id)
+                self.hits += 1
+                return entry["content"]
+            self.misses += 1
+
+        try:
+            with open(room.snapshot_path, "r", encoding="utf-8") as f:
+                cache_data = json.load(f)
+        except Exception as e:
+            print(f"Snapshot load failed for {room.slug}: {e}")
+            return None
+
+        content = cache_data.get("content")
+        if content:
+            print(f"Loaded {room.slug} from cache ({cache_data.get('page_count', '?')} pages, updated: {cache_data.get('last_updated', 'unknown')})")
+            self._store(room, mtime, content)
+        return content or None
+
+    def put(self, room: DataRoom, content: str):
+        """Install freshly fetched content for a room (e.g. after a Notion refresh)."""
+        self._store(room, self._mtime(room), content)
+
+    def derived(self, room: DataRoom, name: str, build: Callable[[], tuple]):
+        """
+        An object computed from a room's snapshot, cached alongside it. build() returns
+        (object, approximate size in bytes); None if the room has no content.
+        """
+        if self.get(room) is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(room.root_page_id)
+            if entry and name in entry["derived"]:
+                return entry["derived"][name][0]
+
+        value, size = build()
+        with self._lock:
+            entry = self._entries.get(room.root_page_id)
+            if entry is not None and name not in entry["derived"]:
+                entry["derived"][name] = (value, size)
+                entry["size"] += size
+                self._size += size
+                self._entries.move_to_end(room.root_page_id)
+                self._evict()
+        return value
+
+    def _store(self, room: DataRoom, mtime: Optional[float], content: str):
+        size = sys.getsizeof(content)
+        with self._lock:
+            old = self._entries.pop(room.root_page_id, None)
+            if old:
+                self._size -= old["size"]
+            self._entries[room.root_page_id] = {"mtime": mtime, "content": content, "size": size, "derived": {}}
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        """Evict least recently used rooms, but always keep the most recent one."""
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted["size"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rooms_loaded": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_registry: Optional[DataRoomRegistry] = None
+_snapshot_cache: Optional[SnapshotCache] = None
+_lock = threading.Lock()
+
+
+def get_registry() -> DataRoomRegistry:
+    """Process-wide data room registry."""
+    global _registry
+    with _lock:
+        if _registry is None:
+            _registry = load_registry()
+        return _registry
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """Process-wide snapshot LRU, sized by ELEVA_SNAPSHOT_CACHE_MB (default 256)."""
+    global _snapshot_cache
+    with _lock:
+        if _snapshot_cache is None:
+            _snapshot_cache = SnapshotCache(
+                max_bytes=int(float(os.getenv("ELEVA_SNAPSHOT_CACHE_MB", "256")) * 1024 * 1024)
+            )
+        return _snapshot_cache
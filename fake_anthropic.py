@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Fake Anthropic Messages API for local benchmarking.
+Serves POST /v1/messages (plain and streaming) with a configurable time-to-first-token
+and token rate, so throughput can be measured without spending API credits.
+
+Point the agent at it with:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8090 ANTHROPIC_API_KEY=fake python api_server.py
+"""
+
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "Eleva AI helps companies turn their knowledge into accurate answers. "
+    "As outlined in our Financial Projections section, revenue grows with each new client. "
+).split()
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ttft = 0.5
+    tokens_per_second = 60.0
+    output_tokens = 300
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/v1/messages":
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        max_tokens = int(request.get("max_tokens", self.output_tokens))
+        tokens = min(self.output_tokens, max_tokens)
+        stop_reason = "max_tokens" if self.output_tokens > max_tokens else "end_turn"
+        input_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "fake"),
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 0},
+        }
+
+        if request.get("stream"):
+            self._stream(message, tokens, stop_reason)
+        else:
+            time.sleep(self.ttft + tokens / self.tokens_per_second)
+            message["content"] = [{"type": "text", "text": self._text(tokens)}]
+            message["stop_reason"] = stop_reason
+            message["usage"]["output_tokens"] = tokens
+            body = json.dumps(message).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def _text(self, tokens: int) -> str:
+        return " ".join(WORDS[i % len(WORDS)] for i in range(tokens))
+
+    def _event(self, name: str, data: dict):
+        payload = f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, message: dict, tokens: int, stop_reason: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.ttft)
+        self._event("message_start", {"type": "message_start", "message": message})
+        self._event("content_block_start", {
+            "type": "content_block_start", "index": 0,
+            "content_block": {"type": "text", "text": ""},
+        })
+        interval = 1.0 / self.tokens_per_second
+        for i in range(tokens):
+            word = WORDS[i % len(WORDS)]
+            self._event("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": word if i == 0 else f" {word}"},
+            })
+            time.sleep(interval)
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": tokens},
+        })
+        self._event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8090, ttft: float = 0.5,
+                tokens_per_second: float = 60.0, output_tokens: int = 300) -> ThreadingHTTPServer:
+    """Build a fake server; handler settings are bound per server instance."""
+    handler = type("Handler", (FakeAnthropicHandler,), {
+        "ttft": ttft,
+        "tokens_per_second": tokens_per_second,
+        "output_tokens": output_tokens,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--ttft", type=float, default=0.5, help="Seconds to first token")
+    parser.add_argument("--tps", type=float, default=60.0, help="Output tokens per second")
+    parser.add_argument("--tokens", type=int, default=300, help="Output tokens per response")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.ttft, args.tps, args.tokens)
+    print(f"Fake Anthropic API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
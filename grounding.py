@@ -0,0 +1,329 @@
+"""
+Answer grounding checks.
+Verifies the figures, quoted phrases and cited section names in a generated answer
+against the data room snapshot, using an index of hashed word 3-grams, normalized
+figures and heading names per section. The index is built at refresh time next to the
+snapshot and only sections whose hash changed are re-indexed, so checks are dictionary
+lookups.
+"""
+
+import re
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from data_rooms import DataRoom, get_snapshot_cache
+from snapshot import changed_sections, load_snapshot, section_index, split_sections, write_snapshot
+
+INDEX_VERSION = 2
+SHINGLE_WORDS = 3
+
+_WORD = re.compile(r"[^\W_]+")
+_FIGURE = re.compile(
+    r"(?<![\w.,])([$€£])?(\d+(?:[.,]\d+)*)"
+    r"(\s?(?:percent|thousand|million|billion|mil millones|millones|millón|mil)\b|%|(?:[kmb]|bn|mm|x)\b)?",
+    re.IGNORECASE
+)
+_SCALES = {"k": 1e3, "thousand": 1e3, "mil": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6,
+           "millones": 1e6, "millón": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9, "mil millones": 1e9}
+_HEADING = re.compile(r"^[ \t]*#{1,6}[ \t]+(.+)$", re.MULTILINE)
+_QUOTE = re.compile(r"[\"“]([^\"“”\n]{8,300})[\"”]")
+_SOURCE_LINE = re.compile(r"\b(?:sources?|sections?|see)\s*:\s*([^\n]+)", re.IGNORECASE)
+_NAMED_SECTION = re.compile(r"[\"“*_]+([^\"“”*_\n]{3,80})[\"”*_]+\s+(?:section|page)\b", re.IGNORECASE)
+# Unquoted Title Case names need a citation cue ("as outlined in our Financial Projections
+# section"); a bare "Landing Page" is a thing, not a reference
+_NAME_WORD = r"[A-Z0-9][\w&'’/-]*"
+_TITLED_SECTION = re.compile(
+    r"\b(?:(?i:in|see|per|from|under|within)[ \t]+(?:(?i:the|our)[ \t]+)?|(?i:our)[ \t]+)"
+    r"(" + _NAME_WORD + r"(?:[ \t]+(?:(?:of|and|the|for|to|de|del|la|el|y)[ \t]+)?" + _NAME_WORD + r"){0,6})"
+    r"[ \t]+(?i:section)\b"
+)
+_LEADING_WORDS = re.compile(r"^(?:(?:see|the|this|that|each|our|in|as|per|from|under|check)(?:\s+|$))+", re.IGNORECASE)
+# Resident bytes per indexed shingle and per section once the lookups are built: the
+# committed snapshot measures ~292 bytes per shingle under tracemalloc (the per-shingle
+# section sets dominate), rounded up so the LRU errs on the side of its bound
+_SHINGLE_BYTES = 300
+_SECTION_BYTES = 2048
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def _shingles(words: list[str]) -> list[int]:
+    """Stable 32-bit hashes of each run of SHINGLE_WORDS words."""
+    return [
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    ]
+
+
+def _readings(number: str) -> list[float]:
+    """
+    Possible values of a number as written. The data room mixes conventions ("$1,500",
+    "340.000", "1,5%"), so a lone separator before exactly three digits reads both as a
+    thousands separator and as a decimal point; with both separators, the last is the decimal.
+    """
+    parts = re.split(r"([.,])", number)
+    digits, separators = parts[::2], parts[1::2]
+    if not separators:
+        return [float(number)]
+    if len(set(separators)) == 2:
+        *whole, fraction = digits
+        if separators[-1] in separators[:-1]:
+            return []
+        return [float("".join(whole) + "." + fraction)]
+    grouped = len(digits[0]) <= 3 and all(len(group) == 3 for group in digits[1:])
+    readings = [float("".join(digits))] if grouped else []
+    if len(separators) == 1:
+        readings.append(float(f"{digits[0]}.{digits[1]}"))
+    return readings
+
+
+def _figures(text: str) -> list[tuple[str, list[str]]]:
+    """
+    (as written, normalized readings) for each figure, so "$2.5M", "$2,500,000" and
+    "2.500.000 $" compare equal.
+    """
+    figures = []
+    for match in _FIGURE.finditer(text):
+        currency, number, unit = match.groups()
+        unit = (unit or "").strip().lower()
+        values = _readings(number)
+        # Bare small integers are list numbering and counts, not claims worth checking
+        if not values or (not currency and not unit and number.isdigit() and int(number) <= 10):
+            continue
+        if unit in ("%", "percent"):
+            keys = [f"{value:.10g}%" for value in values]
+        elif unit == "x":
+            keys = [f"{value:.10g}x" for value in values]
+        else:
+            keys = [f"{value * _SCALES.get(unit, 1):.10g}" for value in values]
+        figures.append((match.group(0).strip(), keys))
+    return figures
+
+
+def _normalize_title(title: str) -> str:
+    return " ".join(_words(title))
+
+
+def _heading_name(heading: str) -> str:
+    """Normalized heading without its list numbering ("### 2. Web" -> "web")."""
+    name = re.sub(r"^(?:\d+ )+", "", _normalize_title(heading))
+    return name if re.search(r"[^\W\d_]", name) else ""
+
+
+def index_section(section: str) -> dict:
+    words = _words(section)
+    headings = {_heading_name(match.group(1)) for match in _HEADING.finditer(section)}
+    return {
+        "shingles": sorted(set(_shingles(words))),
+        "figures": sorted({key for _, keys in _figures(section) for key in keys}),
+        "headings": sorted(heading for heading in headings if heading),
+    }
+
+
+class GroundingIndex:
+    def __init__(self, sections: dict[str, dict], last_updated: Optional[str] = None,
+                 generation: Optional[int] = None):
+        """
+        sections maps each snapshot section key to its title, hash, shingles, figures and
+        headings; generation is the snapshot write it was built from.
+        """
+        self.sections = sections
+        self.last_updated = last_updated
+        self.generation = generation
+        self._lock = threading.Lock()
+        self._shingle_sections: Optional[dict[int, set[str]]] = None
+        self._figure_sections: dict[str, set[str]] = {}
+        self._names: dict[str, set[str]] = {}
+
+    @classmethod
+    def build(cls, data: dict, previous: Optional["GroundingIndex"] = None) -> "GroundingIndex":
+        """
+        Index a snapshot, re-indexing only what moved since previous was built: the
+        snapshot's change history names those sections. If the history doesn't reach
+        back to previous, sections whose hash matches an entry in previous are reused.
+        """
+        moved = changed_sections(data, previous.generation) if previous else None
+        reusable = {entry["hash"]: entry for entry in previous.sections.values()} if previous else {}
+        contents = None
+        sections = {}
+        for key, info in section_index(data).items():
+            if moved is not None and key not in moved and key in previous.sections:
+                entry = previous.sections[key]
+            else:
+                entry = reusable.get(info["hash"])
+            if entry is None:
+                if contents is None:
+                    contents = split_sections(data.get("content", ""))
+                entry = index_section(contents[info["position"]])
+            sections[key] = {**entry, "title": info["title"], "hash": info["hash"]}
+        return cls(sections, data.get("last_updated"), data.get("generation"))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["GroundingIndex"]:
+        data = load_snapshot(path)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["sections"], data.get("last_updated"), data.get("generation"))
+
+    def save(self, path: str):
+        write_snapshot(path, {
+            "version": INDEX_VERSION,
+            "built": datetime.now(timezone.utc).isoformat(),
+            "last_updated": self.last_updated,
+            "generation": self.generation,
+            "sections": self.sections,
+        }, indent=None)
+
+    def memory_estimate(self) -> int:
+        """Approximate bytes held once the lookup tables are built."""
+        shingles = sum(len(entry["shingles"]) for entry in self.sections.values())
+        return shingles * _SHINGLE_BYTES + len(self.sections) * _SECTION_BYTES
+
+    def _lookups(self) -> dict[int, set[str]]:
+        """Invert the per-section index once; indexes are shared across threads."""
+        if self._shingle_sections is None:
+            with self._lock:
+                if self._shingle_sections is None:
+                    shingles: dict[int, set[str]] = {}
+                    figures: dict[str, set[str]] = {}
+                    names: dict[str, set[str]] = {}
+                    for key, entry in self.sections.items():
+                        for shingle in entry["shingles"]:
+                            shingles.setdefault(shingle, set()).add(key)
+                        for figure in entry["figures"]:
+                            figures.setdefault(figure, set()).add(key)
+                        for name in [_normalize_title(entry["title"]), *entry["headings"]]:
+                            if name:
+                                names.setdefault(name, set()).add(key)
+                    self._figure_sections = figures
+                    self._names = names
+                    # Assigned last: the other tables are complete once this is set
+                    self._shingle_sections = shingles
+        return self._shingle_sections
+
+    def _titles_of(self, keys) -> list[str]:
+        return [self.sections[key]["title"] for key in keys]
+
+    def check_figure(self, keys: list[str]) -> list[str]:
+        """Sections containing any reading of a figure."""
+        self._lookups()
+        found = set()
+        for key in keys:
+            found |= self._figure_sections.get(key, set())
+        return self._titles_of(found)
+
+    def check_quote(self, quote: str) -> Optional[list[str]]:
+        """Sections containing every 3-gram of the quote; None if it is too short to check."""
+        shingles = _shingles(_words(quote))
+        if not shingles:
+            return None
+        lookups = self._lookups()
+        found = set(lookups.get(shingles[0], ()))
+        for shingle in shingles[1:]:
+            found &= lookups.get(shingle, set())
+            if not found:
+                break
+        return self._titles_of(found)
+
+    def check_section(self, name: str) -> list[str]:
+        """Sections whose title or one of whose headings matches a cited name, word for word."""
+        self._lookups()
+        wanted = _normalize_title(re.sub(r"\b(?:section|page)\b", "", name, flags=re.IGNORECASE))
+        if not wanted:
+            return []
+        found = set()
+        for candidate, keys in self._names.items():
+            # A one-word heading ("Growth") inside a longer cited name is too weak a match
+            if f" {wanted} " in f" {candidate} " or (" " in candidate and f" {candidate} " in f" {wanted} "):
+                found |= keys
+        return self._titles_of(found)
+
+    def check(self, text: str) -> list[dict]:
+        """
+        Check every figure, quoted phrase and cited section name in text.
+        Returns one dict per claim: kind, text, supported and the supporting section titles.
+        """
+        claims = []
+        seen = set()
+
+        def add(kind: str, claim: str, sections: Optional[list[str]]):
+            if sections is None or (kind, claim) in seen:
+                return
+            seen.add((kind, claim))
+            claims.append({"kind": kind, "text": claim, "supported": bool(sections), "sections": sections})
+
+        for written, keys in _figures(text):
+            add("figure", written, self.check_figure(keys))
+        for match in _QUOTE.finditer(text):
+            add("quote", match.group(1).strip(), self.check_quote(match.group(1)))
+
+        names = [match.group(1) for match in _NAMED_SECTION.finditer(text)]
+        names.extend(match.group(1) for match in _TITLED_SECTION.finditer(text))
+        for match in _SOURCE_LINE.finditer(text):
+            names.extend(re.split(r"[,;|]|\band\b", match.group(1)))
+        for name in names:
+            name = _LEADING_WORDS.sub("", name.strip(" \t*_`\"“”'()[]."))
+            if name:
+                add("section", name, self.check_section(name))
+        return claims
+
+
+def unsupported(claims: list[dict]) -> list[dict]:
+    return [claim for claim in claims if not claim["supported"]]
+
+
+def format_flags(claims: list[dict]) -> str:
+    """Markdown list of the unsupported claims in a check result ("" if there are none)."""
+    labels = {"figure": "Figure", "quote": "Quote", "section": "Cited section"}
+    reasons = {"figure": "not found in the data room", "quote": "not found verbatim in the data room",
+               "section": "no data room section by that name"}
+    # Claims gathered from several checks (e.g. streamed report blocks) may repeat
+    flagged = {(claim["kind"], claim["text"]): claim for claim in unsupported(claims)}
+    return "\n".join(
+        f"- {labels[kind]} “{text}”: {reasons[kind]}"
+        for kind, text in flagged
+    )
+
+
+def update_grounding_index(room: DataRoom, data: dict) -> GroundingIndex:
+    """Rebuild a room's index after a snapshot write, reusing unchanged sections."""
+    index = GroundingIndex.build(data, GroundingIndex.load(room.grounding_path))
+    index.save(room.grounding_path)
+    return index
+
+
+def get_grounding_index(room: DataRoom) -> Optional[GroundingIndex]:
+    """
+    The room's index, cached with its snapshot in the process-wide snapshot LRU: it
+    counts against the same memory bound and is dropped when the snapshot reloads.
+    A sidecar from an older snapshot generation is brought up to date in memory; a room
+    whose content was crawled live, with no snapshot on disk, is indexed from that content.
+    """
+    def build():
+        data = load_snapshot(room.snapshot_path)
+        if data:
+            index = GroundingIndex.load(room.grounding_path)
+            if index is None or index.generation is None or index.generation != data.get("generation"):
+                index = GroundingIndex.build(data, index)
+        else:
+            index = GroundingIndex.build({"content": get_snapshot_cache().get(room)})
+        # Build the lookup tables now, so the size charged to the cache is what's held
+        index._lookups()
+        return index, index.memory_estimate()
+
+    return get_snapshot_cache().derived(room, "grounding", build)
+
+
+def check_answer(room: DataRoom, text: str, content: Optional[str] = None) -> list[dict]:
+    """
+    Check an answer against a room's snapshot. content is indexed instead when the
+    room has no content in the snapshot cache at all; no index means no claims.
+    """
+    index = get_grounding_index(room)
+    if index is None and content:
+        index = GroundingIndex.build({"content": content})
+    return index.check(text) if index else []
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Eleva AI Data Room Agent - Load test
+Simulates concurrent investor sessions replaying a mix of single questions and due
+diligence questionnaires, and reports latency percentiles, throughput, queueing time
+and memory per session.
+
+By default the model is a local fake Anthropic endpoint (fake_anthropic.py) with
+realistic time-to-first-token and streaming rates, so runs cost nothing:
+
+    python loadtest.py --target agent --sessions 50
+    python loadtest.py --target app --sessions 50 --max-concurrent 8
+    python loadtest.py --target api --url http://127.0.0.1:8080 --stream
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Optional
+
+QUESTIONS = [
+    "What is Eleva AI's revenue model and current traction?",
+    "Who are the founders and what is their background?",
+    "What problem does Eleva AI solve and for whom?",
+    "What is your competitive advantage?",
+    "How big is the market opportunity?",
+    "What is the go-to-market strategy?",
+    "How much are you raising and what will the funds be used for?",
+    "What are your key growth metrics?",
+]
+
+QUESTIONNAIRES = [
+    """PRODUCT & MARKET
+- What problem does Eleva AI solve?
+- What is your competitive advantage?
+- Who are your main competitors?
+
+TRACTION & METRICS
+- What is your current revenue?
+- What are your key growth metrics?
+- What is your customer retention?
+
+TEAM & VISION
+- Who are the founders?
+- What is your long-term vision?""",
+    """FINANCIALS
+- What are your revenue projections for the next three years?
+- What is your current burn rate and runway?
+- What is the use of funds for this round?
+
+GO-TO-MARKET
+- How do you acquire customers?
+- What is your sales cycle?""",
+]
+
+
+def _percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _rss_mb() -> float:
+    """Current resident memory in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Runner:
+    """Sends one request for a session and reports (text, time to first chunk)."""
+
+    def __init__(self, args):
+        self.args = args
+        self.target = args.target
+
+        if self.target == "agent":
+            from agent import ElevaDataRoomAgent
+            self.agent = ElevaDataRoomAgent(anthropic_api_key=args.api_key)
+            self.agent.load_data_room(room=args.room)
+        elif self.target == "app":
+            from data_rooms import get_registry, get_snapshot_cache
+            self.room = get_registry().resolve(args.room)
+            self.content = get_snapshot_cache().get(self.room)
+
+    def request(self, kind: str, text: str, started: float) -> tuple[str, Optional[float]]:
+        if self.target == "agent":
+            return self._agent(kind, text, started)
+        if self.target == "app":
+            return self._app(kind, text, started)
+        return self._api(kind, text, started)
+
+    def _consume(self, chunks, started: float) -> tuple[str, Optional[float]]:
+        parts = []
+        ttft = None
+        for chunk in chunks:
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            parts.append(chunk)
+        return "".join(parts), ttft
+
+    def _agent(self, kind: str, text: str, started: float):
+        room = self.args.room
+        if self.args.stream:
+            if kind == "question":
+                return self._consume(self.agent.stream_answer(text, room=room), started)
+            return self._consume(self.agent.stream_document_from_text(text, room=room), started)
+        if kind == "question":
+            return self.agent.answer_question(text, room=room), None
+        return self.agent.generate_document_from_text(text, room=room), None
+
+    def _app(self, kind: str, text: str, started: float):
+        import portal
+        from grounding import check_answer
+        from report_writer import ReportWriter
+
+        if kind == "question":
+            answer = portal.ask_claude(self.args.api_key, portal.SYSTEM_QA, portal.qa_message(self.content, text))
+            check_answer(self.room, answer, content=self.content)
+            return answer, None
+
+        # Same path as the app's report tab: streamed into a temp-file ReportWriter, checked block by block
+        fd, path = tempfile.mkstemp(prefix="eleva-loadtest-", suffix=".md")
+        os.close(fd)
+        writer = ReportWriter(path)
+        first_chunk = []
+
+        def on_chunk(chunk: str):
+            if not first_chunk:
+                first_chunk.append(time.perf_counter() - started)
+
+        try:
+            portal.write_report(
+                self.args.api_key, writer, portal.SYSTEM_DOC,
+                portal.report_message(self.content, "Due Diligence Response", text),
+                max_tokens=8192, on_chunk=on_chunk
+            )
+            for block in writer.blocks():
+                check_answer(self.room, block, content=self.content)
+            return writer.read(), (first_chunk[0] if first_chunk else None)
+        finally:
+            writer.discard()
+
+    def _api(self, kind: str, text: str, started: float):
+        path, body = ("/answer", {"question": text}) if kind == "question" else \
+            ("/document_from_text", {"questions_text": text})
+        if self.args.room:
+            body["room"] = self.args.room
+        body["stream"] = self.args.stream
+        request = urllib.request.Request(
+            self.args.url.rstrip("/") + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=600) as response:
+            if not self.args.stream:
+                return json.loads(response.read())["response"], None
+
+            def chunks():
+                for line in response:
+                    if line.startswith(b"data: ") and line.strip() != b"data: {}":
+                        yield json.loads(line[6:]).get("text", "")
+            return self._consume(chunks(), started)
+
+    def queue_info(self) -> tuple[Optional[float], bool]:
+        """Queue time and coalescing for the calling thread's last in-process request."""
+        if self.target == "api":
+            return None, False
+        from admission import get_admission_controller
+        return get_admission_controller().last_wait()
+
+
+def run_session(session_id: int, runner: Runner, args, results: list, lock: threading.Lock):
+    rng = random.Random(args.seed + session_id)
+    time.sleep(rng.uniform(0, args.ramp))
+
+    for i in range(args.requests_per_session):
+        if rng.random() < args.questionnaire_ratio:
+            kind, text = "questionnaire", rng.choice(QUESTIONNAIRES)
+        else:
+            kind, text = "question", rng.choice(QUESTIONS)
+        if args.unique:
+            text = f"{text}\n(session {session_id}, request {i})"
+
+        started = time.perf_counter()
+        record = {"session": session_id, "kind": kind, "ok": True}
+        try:
+            response, ttft = runner.request(kind, text, started)
+            record["ttft"] = ttft
+            record["characters"] = len(response)
+        except Exception as e:
+            record["ok"] = False
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["latency"] = time.perf_counter() - started
+        record["queue"], record["coalesced"] = runner.queue_info()
+
+        with lock:
+            results.append(record)
+
+        if args.think > 0:
+            time.sleep(rng.expovariate(1 / args.think))
+
+
+def summarize(results: list, wall: float, sessions: int, rss_delta: float) -> dict:
+    ok = [r for r in results if r["ok"]]
+
+    def dist(values):
+        return {
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+            "max": max(values) if values else None,
+        }
+
+    summary = {
+        "sessions": sessions,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "wall_seconds": wall,
+        "throughput_rps": len(ok) / wall if wall else 0.0,
+        "latency": dist([r["latency"] for r in ok]),
+        "queue": dist([r["queue"] for r in ok if r["queue"] is not None]),
+        "ttft": dist([r["ttft"] for r in ok if r.get("ttft") is not None]),
+        "coalesced": sum(1 for r in ok if r["coalesced"]),
+        "by_kind": {},
+        "rss_delta_mb": rss_delta,
+        "rss_per_session_mb": rss_delta / sessions if sessions else 0.0,
+    }
+    for kind in ("question", "questionnaire"):
+        latencies = [r["latency"] for r in ok if r["kind"] == kind]
+        if latencies:
+            summary["by_kind"][kind] = {"count": len(latencies), **dist(latencies)}
+    errors = sorted({r["error"] for r in results if not r["ok"]})
+    if errors:
+        summary["error_samples"] = errors[:5]
+    return summary
+
+
+def print_summary(summary: dict, target: str):
+    def fmt(value):
+        return "    -  " if value is None else f"{value:7.2f}"
+
+    print(f"\nTarget: {target}  Sessions: {summary['sessions']}  "
+          f"Requests: {summary['requests']} ({summary['errors']} errors)  "
+          f"Wall: {summary['wall_seconds']:.1f}s")
+    print(f"Throughput: {summary['throughput_rps']:.2f} req/s  "
+          f"Coalesced: {summary['coalesced']}")
+    print(f"\n{'':24}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}")
+    rows = [("latency (s)", summary["latency"]), ("queue (s)", summary["queue"]),
+            ("ttft (s)", summary["ttft"])]
+    rows += [(f"  {kind} (n={d['count']})", d) for kind, d in summary["by_kind"].items()]
+    for label, d in rows:
+        print(f"{label:24}" + "".join(fmt(d[k]) for k in ("p50", "p95", "p99", "max")))
+    print(f"\nMemory: RSS +{summary['rss_delta_mb']:.1f} MB total, "
+          f"{summary['rss_per_session_mb']:.2f} MB/session")
+    for error in summary.get("error_samples", []):
+        print(f"Error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the data room agent with simulated investors")
+    parser.add_argument("--target", choices=["agent", "app", "api"], default="agent",
+                        help="ElevaDataRoomAgent, the Streamlit app's ask_claude path, or a running api_server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="api_server.py URL for --target api")
+    parser.add_argument("--room", help="Data room slug or root page id")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent investor sessions")
+    parser.add_argument("--requests-per-session", type=int, default=3)
+    parser.add_argument("--questionnaire-ratio", type=float, default=0.2,
+                        help="Share of requests that are DD questionnaires")
+    parser.add_argument("--think", type=float, default=2.0, help="Mean think time between requests (s)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Spread session starts over this many seconds")
+    parser.add_argument("--unique", action="store_true",
+                        help="Make every request unique (disables single-flight coalescing)")
+    parser.add_argument("--stream", action="store_true", help="Use streaming calls and measure time to first token")
+    parser.add_argument("--max-concurrent", type=int, help="Override ELEVA_MAX_CONCURRENT_REQUESTS")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--real", action="store_true",
+                        help="Call the real Anthropic API instead of the local fake endpoint")
+    parser.add_argument("--ttft", type=float, default=0.8, help="Fake endpoint time to first token (s)")
+    parser.add_argument("--tps", type=float, default=60.0, help="Fake endpoint output tokens per second")
+    parser.add_argument("--tokens", type=int, default=400, help="Fake endpoint output tokens per response")
+    parser.add_argument("--json", help="Write the summary and raw results to this file")
+    args = parser.parse_args()
+
+    if args.max_concurrent:
+        os.environ["ELEVA_MAX_CONCURRENT_REQUESTS"] = str(args.max_concurrent)
+
+    server = None
+    if args.real:
+        args.api_key = os.getenv("ANTHROPIC_API_KEY")
+    elif args.target != "api":
+        from fake_anthropic import make_server
+        server = make_server(port=0, ttft=args.ttft, tokens_per_second=args.tps, output_tokens=args.tokens)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+        args.api_key = "fake"
+        print(f"Fake Anthropic endpoint on {os.environ['ANTHROPIC_BASE_URL']} "
+              f"(ttft {args.ttft}s, {args.tps} tok/s, {args.tokens} tokens)")
+
+    runner = Runner(args)
+    results: list = []
+    lock = threading.Lock()
+    rss_before = _rss_mb()
+
+    print(f"Running {args.sessions} sessions x {args.requests_per_session} requests against {args.target}...")
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_session, args=(i, runner, args, results, lock), daemon=True)
+        for i in range(args.sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    summary = summarize(results, wall, args.sessions, _rss_mb() - rss_before)
+    print_summary(summary, args.target)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+        print(f"\nSaved to {args.json}")
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,58 @@ Notion Client Helper for Eleva AI Data Room
 Fetches and processes content from the Notion data room.
 """
 
-from notion_client import Client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import Optional
 
+from snapshot import build_content
+
+# Database property types rendered into tables; everything else is skipped
+DATABASE_PROPERTY_TYPES = {
+    "title", "rich_text", "number", "select", "multi_select", "status", "date",
+    "checkbox", "url", "email", "phone_number", "formula", "rollup", "people", "unique_id",
+}
+
+
+def parse_notion_time(value: str) -> datetime:
+    """Parse Notion's ISO timestamps (e.g. 2024-05-01T10:00:00.000Z) as aware datetimes."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
 
 class NotionDataRoom:
-    def __init__(self, api_key: str, root_page_id: str):
+    def __init__(
+        self,
+        api_key: str,
+        root_page_id: str,
+        database_cache_path: Optional[str] = None,
+        max_database_rows: Optional[int] = None,
+        database_workers: int = 3,
+        database_revalidate_hours: float = 24
+    ):
+        """
+        max_database_rows caps how many rows of each child database are rendered (None
+        renders all). Refresh cost is already bounded by the database cache; the cap only
+        bounds snapshot and prompt size, at the price of content the agent can't see.
+        Cached renderings are re-queried after database_revalidate_hours even when their
+        version is unchanged, since deleting an older row doesn't always change it.
+        """
+        # Imported here so modules that only read the cached snapshot stay fast to import
+        from notion_client import Client
+
         self.client = Client(auth=api_key)
         self.root_page_id = root_page_id
+        self.max_database_rows = max_database_rows
+        self.database_workers = database_workers
+        self.database_revalidate_hours = database_revalidate_hours
         self._content_cache: dict = {}
+        self._database_text: dict = {}
+        self._database_lock = threading.Lock()
+        self._database_cache_path = database_cache_path
+        self._database_cache: dict = self._load_database_cache()
 
     def get_page_content(self, page_id: str) -> dict:
         """Fetch a single page's content and metadata."""
@@ -20,10 +63,12 @@ class NotionDataRoom:
 
         page = self.client.pages.retrieve(page_id=page_id)
         blocks = self._get_all_blocks(page_id)
+        self._fetch_databases(blocks)
 
         content = {
             "id": page_id,
             "title": self._extract_title(page),
+            "last_edited_time": page.get("last_edited_time"),
             "blocks": blocks,
             "text": self._blocks_to_text(blocks),
         }
@@ -129,6 +174,9 @@ class NotionDataRoom:
             elif block_type == "child_database":
                 title = block.get("child_database", {}).get("title", "Untitled Database")
                 text_parts.append(f"{prefix}📊 [{title}]")
+                table_text = self._database_text.get(block.get("id"))
+                if table_text:
+                    text_parts.append("\n".join(f"{prefix}{line}" for line in table_text.split("\n")))
 
             # Process children recursively
             if "children" in block:
@@ -156,6 +204,218 @@ class NotionDataRoom:
 
         return "\n".join(rows)
 
+    # ── Child databases ──
+
+    def _load_database_cache(self) -> dict:
+        """Load rendered databases from a previous run, keyed by database id."""
+        if not self._database_cache_path or not os.path.exists(self._database_cache_path):
+            return {}
+        try:
+            with open(self._database_cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Database cache load failed: {e}")
+            return {}
+
+    def save_database_cache(self):
+        """Persist rendered databases so the next refresh can skip unchanged ones."""
+        if not self._database_cache_path:
+            return
+        with self._database_lock:
+            data = dict(self._database_cache)
+        with open(self._database_cache_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def _fetch_databases(self, blocks: list):
+        """Query every child database among the blocks concurrently."""
+        database_ids = []
+        pending = list(blocks)
+        while pending:
+            block = pending.pop()
+            if block.get("type") == "child_database" and block.get("id") not in self._database_text:
+                database_ids.append(block["id"])
+            pending.extend(block.get("children", []))
+
+        if not database_ids:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.database_workers) as pool:
+            for database_id, text in zip(database_ids, pool.map(self._get_database_text, database_ids)):
+                self._database_text[database_id] = text
+
+    def _call_with_retry(self, method, retries: int = 4, **kwargs):
+        """Call a Notion endpoint, backing off when rate limited."""
+        for attempt in range(retries + 1):
+            try:
+                return method(**kwargs)
+            except Exception as e:
+                if getattr(e, "code", None) != "rate_limited" or attempt == retries:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _get_database_text(self, database_id: str) -> str:
+        """
+        Render a database as a table, reusing the cached rendering when unchanged.
+        The cache version combines the database's last_edited_time with its most
+        recently edited row, so an unchanged database costs two small requests. Row
+        deletions may not change either, so renderings are also revalidated by age.
+        If Notion fails, the last good rendering is kept; without one the error is raised
+        so the page is retried rather than saved without its table.
+        """
+        with self._database_lock:
+            cached = self._database_cache.get(database_id)
+        try:
+            database = self._call_with_retry(self.client.databases.retrieve, database_id=database_id)
+            latest = self._call_with_retry(
+                self.client.databases.query,
+                database_id=database_id,
+                page_size=1,
+                sorts=[{"timestamp": "last_edited_time", "direction": "descending"}]
+            )
+            latest_row = latest["results"][0]["last_edited_time"] if latest["results"] else ""
+            version = f"{database.get('last_edited_time', '')}|{latest_row}"
+
+            if cached and cached.get("version") == version and self._is_fresh(cached):
+                return cached["text"]
+
+            rows, truncated = self._query_database(database_id, database)
+            text = self._database_to_text(database, rows, truncated)
+            with self._database_lock:
+                self._database_cache[database_id] = {
+                    "version": version,
+                    "rendered_at": datetime.now(timezone.utc).isoformat(),
+                    "text": text,
+                }
+            return text
+
+        except Exception as e:
+            if not cached or "text" not in cached:
+                raise
+            print(f"Error fetching database {database_id}, keeping the cached rendering: {e}")
+            return cached["text"]
+
+    def _is_fresh(self, cached: dict) -> bool:
+        """Whether a cached rendering is young enough to trust its version alone."""
+        rendered_at = cached.get("rendered_at")
+        if not rendered_at:
+            return False
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(rendered_at)
+        return age.total_seconds() < self.database_revalidate_hours * 3600
+
+    def _database_columns(self, database: dict) -> list[str]:
+        """Renderable property names, title column first."""
+        properties = database.get("properties", {})
+        columns = [name for name, prop in properties.items()
+                   if prop.get("type") in DATABASE_PROPERTY_TYPES]
+        columns.sort(key=lambda name: properties[name].get("type") != "title")
+        return columns
+
+    def _query_database(self, database_id: str, database: dict) -> tuple[list[list[str]], bool]:
+        """
+        Page through a database, keeping only the rendered cell values of each row.
+        Stops after max_database_rows (if set); returns the rows and whether any were left out.
+        """
+        columns = self._database_columns(database)
+        limit = self.max_database_rows
+        rows = []
+        cursor = None
+        has_more = True
+
+        while has_more and (limit is None or len(rows) < limit):
+            response = self._call_with_retry(
+                self.client.databases.query,
+                database_id=database_id,
+                start_cursor=cursor,
+                page_size=100
+            )
+
+            for row in response["results"]:
+                props = row.get("properties", {})
+                rows.append([self._property_to_text(props.get(name, {})) for name in columns])
+
+            has_more = response.get("has_more", False)
+            cursor = response.get("next_cursor")
+
+        if limit is None:
+            return rows, False
+        return rows[:limit], has_more or len(rows) > limit
+
+    def _database_to_text(self, database: dict, rows: list[list[str]], truncated: bool = False) -> str:
+        """Convert database rows to the same pipe-separated format as tables."""
+        columns = self._database_columns(database)
+        if not columns:
+            return ""
+
+        lines = [" | ".join(columns)]
+        lines.extend(" | ".join(cells) for cells in rows)
+        if truncated:
+            lines.append(f"(showing first {self.max_database_rows} rows)")
+        return "\n".join(lines)
+
+    def _property_to_text(self, prop: dict) -> str:
+        """Convert a database property value to plain text."""
+        prop_type = prop.get("type")
+        value = prop.get(prop_type)
+
+        if value is None:
+            return ""
+        if prop_type in ("title", "rich_text"):
+            return self._rich_text_to_plain(value).replace("\n", " ")
+        if prop_type == "number":
+            return str(int(value)) if float(value).is_integer() else str(value)
+        if prop_type in ("select", "status"):
+            return value.get("name", "")
+        if prop_type == "multi_select":
+            return ", ".join(option.get("name", "") for option in value)
+        if prop_type == "date":
+            end = value.get("end")
+            return f"{value.get('start', '')} → {end}" if end else value.get("start", "")
+        if prop_type == "checkbox":
+            return "✓" if value else ""
+        if prop_type in ("url", "email", "phone_number"):
+            return value
+        if prop_type == "people":
+            return ", ".join(person.get("name", "") for person in value)
+        if prop_type == "unique_id":
+            prefix = value.get("prefix")
+            return f"{prefix}-{value.get('number')}" if prefix else str(value.get("number", ""))
+        if prop_type in ("formula", "rollup"):
+            inner_type = value.get("type")
+            if inner_type == "array":
+                return ", ".join(self._property_to_text(item) for item in value.get("array", []))
+            return self._property_to_text({"type": inner_type, inner_type: value.get(inner_type)})
+        if prop_type == "string":
+            return value
+        if prop_type == "boolean":
+            return "✓" if value else ""
+        return ""
+
+    def search_edited_since(self, since: datetime) -> list[dict]:
+        """
+        Pages (including database rows) edited at or after since, newest first.
+        Uses workspace search sorted by last_edited_time, so a quiet poll is one request.
+        """
+        results = []
+        cursor = None
+
+        while True:
+            response = self._call_with_retry(
+                self.client.search,
+                filter={"property": "object", "value": "page"},
+                sort={"direction": "descending", "timestamp": "last_edited_time"},
+                start_cursor=cursor,
+                page_size=100
+            )
+
+            for result in response["results"]:
+                if parse_notion_time(result["last_edited_time"]) < since:
+                    return results
+                results.append(result)
+
+            if not response.get("has_more"):
+                return results
+            cursor = response.get("next_cursor")
+
     def get_all_pages(self) -> list[dict]:
         """Fetch all pages in the data room recursively."""
         pages = []
@@ -183,18 +443,9 @@ class NotionDataRoom:
 
     def get_full_data_room_content(self) -> str:
         """Get all content from the data room as a single text."""
-        pages = self.get_all_pages()
-
-        sections = []
-        for page in pages:
-            section = f"\n{'='*60}\n"
-            section += f"# {page['title']}\n"
-            section += f"{'='*60}\n\n"
-            section += page['text']
-            sections.append(section)
-
-        return "\n\n".join(sections)
+        return build_content(self.get_all_pages())
 
     def clear_cache(self):
-        """Clear the content cache."""
+        """Clear the content cache. Database renderings stay cached by version."""
         self._content_cache.clear()
+        self._database_text.clear()
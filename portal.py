@@ -0,0 +1,117 @@
+"""
+Eleva AI - Investor Portal core
+Prompts and the Claude call behind the Streamlit app, importable without Streamlit
+so the same path can be exercised by scripts and load tests.
+"""
+
+import threading
+
+from admission import get_admission_controller, request_key
+from report_writer import generate_report
+
+MODEL = "claude-sonnet-4-20250514"
+
+SYSTEM_QA = """You are the Eleva AI Data Room Assistant. Your role is to help investors
+get accurate answers based on the company's official data room documentation.
+
+GUIDELINES:
+1. Use the exact terminology, phrasing, and tone from the data room.
+2. Structure responses clearly with headings, bullet points, and lists.
+3. Only include information explicitly stated in or directly inferred from the data room.
+4. When relevant, reference which section the information comes from.
+5. Maintain a confident, professional tone appropriate for investor relations.
+6. If information is missing, clearly state what is available and what would need to be addressed separately.
+
+You have access to the complete Eleva AI Data Room content below."""
+
+SYSTEM_DOC = """You are the Eleva AI Data Room Assistant generating formal investor documents.
+
+Your task is to:
+1. Parse the provided text to identify all questions (they may be organized by categories)
+2. Answer each question using ONLY information from the data room
+3. Generate a professional, well-structured document ready to send to investors
+
+GUIDELINES:
+- Preserve the category structure if questions are organized by sections.
+- Use the exact terminology and tone from the data room.
+- Only include information explicitly stated in the data room.
+- Maintain a confident, professional tone.
+- If information is missing, note that additional details can be provided upon request.
+
+Output a complete, polished document in Markdown format."""
+
+
+def qa_message(content: str, question: str) -> str:
+    return f"DATA ROOM CONTENT:\n{content}\n\n---\n\nINVESTOR QUESTION:\n{question}\n\nProvide a professional response based on the data room content."
+
+
+def report_message(content: str, title: str, questions_text: str) -> str:
+    return f"DATA ROOM CONTENT:\n{content}\n\n---\n\nDOCUMENT REQUEST:\nTitle: {title}\n\nQUESTIONS:\n{questions_text}\n\nGenerate a professional investor document addressing all questions, preserving category structure."
+
+
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def _client(api_key: str):
+    """One Anthropic client per key, so sessions reuse pooled connections."""
+    with _clients_lock:
+        if api_key not in _clients:
+            import anthropic
+            _clients[api_key] = anthropic.Anthropic(api_key=api_key)
+        return _clients[api_key]
+
+
+def ask_claude(api_key: str, system_prompt: str, user_message: str, max_tokens: int = 4096, on_queue=None) -> str:
+    if not api_key:
+        return "Service temporarily unavailable."
+
+    def call() -> str:
+        response = _client(api_key).messages.create(
+            model=MODEL,
+            max_tokens=max_tokens,
+            system=system_prompt,
+            messages=[{"role": "user", "content": user_message}]
+        )
+        return response.content[0].text
+
+    # Shared across all sessions: caps concurrent calls and coalesces identical ones
+    request_id = request_key(MODEL, str(max_tokens), system_prompt, user_message)
+    return get_admission_controller().run(request_id, call, on_queue=on_queue)
+
+
+def stream_claude(
+    api_key: str,
+    system_prompt: str,
+    user_message: str,
+    max_tokens: int = 8192,
+    prefill: str = None,
+    result: dict = None,
+    on_queue=None
+):
+    """Stream one request, yielding text; result receives the stop_reason."""
+    messages = [{"role": "user", "content": user_message}]
+    if prefill:
+        messages.append({"role": "assistant", "content": prefill})
+
+    with get_admission_controller().slot(on_queue):
+        with _client(api_key).messages.stream(
+            model=MODEL,
+            max_tokens=max_tokens,
+            system=system_prompt,
+            messages=messages
+        ) as stream:
+            yield from stream.text_stream
+            if result is not None:
+                result["stop_reason"] = stream.get_final_message().stop_reason
+
+
+def write_report(api_key: str, writer, system_prompt: str, user_message: str,
+                 max_tokens: int = 8192, on_chunk=None, on_queue=None):
+    """Stream a report into a ReportWriter, continuing past max_tokens."""
+    writer.begin(request_key(MODEL, str(max_tokens), system_prompt, user_message))
+
+    def segment(prefill, message, result):
+        return stream_claude(api_key, system_prompt, message, max_tokens, prefill, result, on_queue)
+
+    return generate_report(writer, segment, user_message, on_chunk=on_chunk)
@@ -1,54 +1,99 @@
 #!/usr/bin/env python3
 """
 Refresh the data room cache.
-Fetches all content from Notion and saves it to a local JSON file.
+Fetches all content from Notion and saves it to each room's snapshot JSON file.
 Run manually or via GitHub Actions on a schedule.
 """
 
-import json
+import argparse
 import os
 import sys
 from datetime import datetime, timezone
 
+from data_rooms import DataRoom, load_registry
+from grounding import update_grounding_index
 from notion_client_helper import NotionDataRoom
+from snapshot import build_content, load_snapshot, page_meta, record_changes, write_snapshot
 
 
-def main():
-    notion_key = os.getenv("NOTION_API_KEY")
-    page_id = os.getenv("NOTION_ROOT_PAGE_ID", "1c978b84590d80d48509e1585e9ff849")
-
-    if not notion_key:
-        print("Error: NOTION_API_KEY not set")
-        sys.exit(1)
-
-    print("Fetching data room content from Notion...")
-    notion = NotionDataRoom(notion_key, page_id)
+def refresh_room(notion_key: str, room: DataRoom):
+    """Crawl one data room from Notion and write its snapshot."""
+    print(f"Fetching data room '{room.slug}' from Notion...")
+    # Floored to Notion's minute precision so edits later in the starting minute aren't skipped
+    started = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    notion = NotionDataRoom(
+        notion_key, room.root_page_id,
+        database_cache_path=room.database_cache_path,
+        max_database_rows=room.max_database_rows
+    )
     pages = notion.get_all_pages()
+    notion.save_database_cache()
 
-    # Build the cached content
-    sections = []
-    for page in pages:
-        section = f"\n{'='*60}\n"
-        section += f"# {page['title']}\n"
-        section += f"{'='*60}\n\n"
-        section += page['text']
-        sections.append(section)
-
-    full_content = "\n\n".join(sections)
+    full_content = build_content(pages)
 
     cache_data = {
         "last_updated": datetime.now(timezone.utc).isoformat(),
         "page_count": len(pages),
+        # Edits made after the crawl started are picked up by watch_data_room.py
+        "cursor": started.isoformat(),
+        "pages": [page_meta(page) for page in pages],
         "content": full_content,
     }
 
-    cache_path = os.path.join(os.path.dirname(__file__), "data_room_cache.json")
-    with open(cache_path, "w", encoding="utf-8") as f:
-        json.dump(cache_data, f, ensure_ascii=False, indent=2)
+    # Section hashes decide what moved; only changed sections are diffed line by line
+    diff = record_changes(load_snapshot(room.snapshot_path), cache_data, room.changelog_path)
+    write_snapshot(room.snapshot_path, cache_data)
+    update_grounding_index(room, cache_data)
 
     print(f"Cache saved: {len(pages)} pages, {len(full_content)} characters")
+    print(f"Sections: {len(diff['changed'])} changed, {len(diff['added'])} added, "
+          f"{len(diff['removed'])} removed, {diff['unchanged']} unchanged")
     print(f"Last updated: {cache_data['last_updated']}")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Refresh data room snapshots from Notion")
+    parser.add_argument(
+        "--room",
+        action="append",
+        help="Room slug or root page id to refresh (repeatable; default room if omitted)"
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Refresh every room in data_rooms.json"
+    )
+    parser.add_argument(
+        "--due",
+        action="store_true",
+        help="Refresh only rooms whose snapshot is older than their refresh interval"
+    )
+    args = parser.parse_args()
+
+    notion_key = os.getenv("NOTION_API_KEY")
+    if not notion_key:
+        print("Error: NOTION_API_KEY not set")
+        sys.exit(1)
+
+    registry = load_registry()
+    if args.all or args.due:
+        rooms = registry.rooms()
+    else:
+        try:
+            rooms = [registry.resolve(key) for key in args.room or [None]]
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+
+    if args.due:
+        now = datetime.now(timezone.utc)
+        rooms = [room for room in rooms if room.is_due(now)]
+        if not rooms:
+            print("All data rooms are up to date")
+
+    for room in rooms:
+        refresh_room(notion_key, room)
+
+
 if __name__ == "__main__":
     main()
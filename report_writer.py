@@ -0,0 +1,248 @@
+"""
+Incremental report writer.
+Streams generated reports to disk (or a bounded in-memory spool) as they arrive,
+keeps a resumable partial when generation is interrupted, and continues responses
+that stop at max_tokens instead of truncating them.
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Iterator, Optional
+
+# Text from the end of the partial report sent back as the assistant prefill
+CONTINUATION_TAIL_BYTES = 6000
+
+StreamSegment = Callable[[Optional[str], str, dict], Iterator[str]]
+
+
+class ReportWriter:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        spool_bytes: int = 1024 * 1024,
+        flush_bytes: int = 4096,
+        flush_interval: float = 1.0
+    ):
+        """
+        Write to path (resumable), or to an in-memory spool that moves to a temp
+        file once it exceeds spool_bytes.
+        """
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.state_path = f"{path}.partial.json" if path else None
+        self.state: dict = {}
+        self.bytes_written = 0
+        self.headings: list[str] = []
+        self._line = ""
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        if path:
+            self._file = open(path, "ab+")
+        else:
+            self._file = tempfile.SpooledTemporaryFile(max_size=spool_bytes, mode="w+b")
+
+    def begin(self, fingerprint: str) -> bool:
+        """
+        Start writing the report identified by fingerprint. If the file holds an
+        unfinished partial of the same report, keep it and return True.
+        """
+        previous = {}
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        resumed = previous.get("fingerprint") == fingerprint and not previous.get("complete") and size > 0
+
+        if resumed:
+            self.bytes_written = size
+            self.state = previous
+            # Headings may have been written after the last checkpoint
+            self._file.seek(0)
+            self.headings = [line.decode("utf-8", errors="ignore").strip()
+                             for line in self._file if line.startswith(b"#")]
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file.seek(0)
+            self._file.truncate()
+            self.bytes_written = 0
+            self.headings = []
+            self.state = {"fingerprint": fingerprint, "continuations": 0}
+        self._save_state(complete=False)
+        return resumed
+
+    def write(self, chunk: str):
+        data = chunk.encode("utf-8")
+        self._file.write(data)
+        self.bytes_written += len(data)
+        self._unflushed += len(data)
+        self._track_headings(chunk)
+
+        if self._unflushed >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def _track_headings(self, chunk: str):
+        """Remember Markdown headings so continuations know which sections are done."""
+        lines = (self._line + chunk).split("\n")
+        self._line = lines.pop()
+        for line in lines:
+            if line.startswith("#"):
+                self.headings.append(line.strip())
+
+    def checkpoint(self, stop_reason: Optional[str]):
+        """Flush and record progress after each generated segment."""
+        self.flush()
+        self.state["stop_reason"] = stop_reason
+        self._save_state(complete=False)
+
+    def finish(self):
+        """Mark the report complete; file-backed writers drop their partial state."""
+        self.flush()
+        if self.state_path and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        self.state["complete"] = True
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.state.get("complete"))
+
+    def _save_state(self, complete: bool):
+        if not self.state_path:
+            return
+        self.state.update({"complete": complete, "bytes": self.bytes_written, "headings": self.headings})
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def tail(self, max_bytes: int = CONTINUATION_TAIL_BYTES) -> str:
+        """The end of the report so far, for continuation requests."""
+        self.flush()
+        self._file.seek(max(0, self.bytes_written - max_bytes))
+        data = self._file.read()
+        self._file.seek(0, os.SEEK_END)
+        return data.decode("utf-8", errors="ignore")
+
+    def strip_trailing_whitespace(self) -> str:
+        """
+        Drop whitespace from the end of the report and return the new tail. Prefills may
+        not end in whitespace, and the continuation starts with that whitespace itself,
+        so leaving it on disk would double it at every continuation boundary.
+        """
+        tail = self.tail()
+        stripped = tail.rstrip()
+        removed = tail[len(stripped):]
+        if removed:
+            self.bytes_written -= len(removed.encode("utf-8"))
+            self._file.seek(self.bytes_written)
+            self._file.truncate()
+            self._file.seek(0, os.SEEK_END)
+            self._line = "" if "\n" in removed else self._line.rstrip()
+        return stripped
+
+    def blocks(self) -> Iterator[str]:
+        """The report so far as Markdown blocks (split at blank lines), read a line at a time."""
+        self.flush()
+        self._file.seek(0)
+        block = []
+        for line in self._file:
+            line = line.decode("utf-8", errors="ignore")
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield "".join(block)
+                block = []
+        if block:
+            yield "".join(block)
+        self._file.seek(0, os.SEEK_END)
+
+    def read(self) -> str:
+        """The whole report so far (usable while generation is still running)."""
+        self.flush()
+        self._file.seek(0)
+        data = self._file.read()
+        self._file.seek(0, os.SEEK_END)
+        return data.decode("utf-8")
+
+    def reader(self):
+        """
+        A binary file object positioned at the start, e.g. for downloads. File-backed
+        writers return a separate read-only handle the caller should close.
+        """
+        self.flush()
+        if self.path:
+            return open(self.path, "rb")
+        self._file.seek(0)
+        return self._file
+
+    def discard(self):
+        """Close the writer and delete its file and partial state."""
+        self.close()
+        for path in (self.path, self.state_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        self._file.close()
+
+
+def continuation_message(user_message: str, headings: list[str]) -> str:
+    """Ask the model to pick up a report where the previous response stopped."""
+    written = "\n".join(headings[-40:]) or "(no headings yet)"
+    return f"""{user_message}
+
+---
+
+The document has already been partially written. Sections written so far:
+{written}
+
+Continue the document exactly where it stops. Do not repeat any text that was already
+written, and do not restart the document."""
+
+
+def generate_report(
+    writer: ReportWriter,
+    stream_segment: StreamSegment,
+    user_message: str,
+    max_continuations: int = 3,
+    on_chunk: Optional[Callable[[str], None]] = None
+) -> ReportWriter:
+    """
+    Stream a report into writer, continuing while responses stop at max_tokens.
+
+    stream_segment(prefill, message, result) yields text for one request; prefill is
+    the end of the partial report to continue from (None for a fresh start) and the
+    final stop_reason is stored in result["stop_reason"].
+    """
+    while True:
+        prefill = None
+        message = user_message
+        if writer.bytes_written:
+            # Prefills may not end in whitespace; the continuation writes it again
+            prefill = writer.strip_trailing_whitespace() or None
+            message = continuation_message(user_message, writer.headings)
+
+        result: dict = {}
+        for chunk in stream_segment(prefill, message, result):
+            writer.write(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+        writer.checkpoint(result.get("stop_reason"))
+
+        if result.get("stop_reason") != "max_tokens":
+            writer.finish()
+            return writer
+        if writer.state.get("continuations", 0) >= max_continuations:
+            print(f"Report still incomplete after {max_continuations} continuations; partial kept")
+            return writer
+        writer.state["continuations"] = writer.state.get("continuations", 0) + 1
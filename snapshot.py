@@ -0,0 +1,267 @@
+"""
+Data room snapshot files.
+Builds the cached content from crawled pages, splits it back into per-page sections,
+diffs snapshots section by section, and writes them atomically so readers never see
+a partial file.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Optional
+
+SECTION_RULE = "=" * 60
+_SECTION_BOUNDARY = re.compile(r"\n\n(?=\n" + SECTION_RULE + r"\n# )")
+# Snapshot writes whose change sets are kept, so caches that missed some can catch up
+CHANGE_HISTORY = 100
+
+
+def render_section(title: str, text: str) -> str:
+    """Render one page as a snapshot section."""
+    section = f"\n{SECTION_RULE}\n"
+    section += f"# {title}\n"
+    section += f"{SECTION_RULE}\n\n"
+    section += text
+    return section
+
+
+def build_content(pages: list[dict]) -> str:
+    """Join crawled pages into the single text the agent reads."""
+    return "\n\n".join(render_section(page["title"], page["text"]) for page in pages)
+
+
+def split_sections(content: str) -> list[str]:
+    """Split snapshot content back into its per-page sections, in order."""
+    return _SECTION_BOUNDARY.split(content) if content else []
+
+
+def section_hash(section: str) -> str:
+    """Short content hash of a rendered section."""
+    return hashlib.sha256(section.encode("utf-8")).hexdigest()[:16]
+
+
+def section_title(section: str) -> str:
+    """Title from a section's "# Title" header line."""
+    lines = section.lstrip("\n").split("\n", 2)
+    return lines[1][2:] if len(lines) > 1 and lines[1].startswith("# ") else "Untitled"
+
+
+def page_meta(page: dict) -> dict:
+    """
+    Structural metadata kept for each page in the snapshot, so watchers can
+    patch single pages without recrawling: top-level child pages (the crawl
+    order) and every child database anywhere on the page.
+    """
+    children = []
+    databases = []
+    pending = list(page.get("blocks", []))
+    for block in page.get("blocks", []):
+        if block.get("type") == "child_page":
+            children.append(block["id"])
+    while pending:
+        block = pending.pop()
+        if block.get("type") == "child_database":
+            databases.append(block["id"])
+        pending.extend(block.get("children", []))
+
+    return {
+        "id": page["id"],
+        "title": page["title"],
+        "last_edited_time": page.get("last_edited_time"),
+        "hash": section_hash(render_section(page["title"], page["text"])),
+        "children": children,
+        "databases": databases,
+    }
+
+
+def load_snapshot(path: str) -> dict:
+    """Read a snapshot file; missing files read as an empty snapshot."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_snapshot(path: str, data: dict, indent: Optional[int] = 2):
+    """Write a snapshot via a temp file in the same directory and an atomic rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _has_page_index(data: dict) -> bool:
+    pages = data.get("pages") or []
+    return bool(pages) and len(pages) == len(split_sections(data.get("content", "")))
+
+
+def section_index(data: dict, by_title: bool = False) -> dict[str, dict]:
+    """
+    Map each section of a snapshot to its title, hash and position, keyed by page id
+    (or by title, for snapshots written before the page index existed; repeated titles
+    get a "#2", "#3"... suffix). Hashes stored in the page index are used as-is; older
+    snapshots are hashed once here.
+    """
+    pages = data.get("pages") or []
+    if not by_title and pages and all("hash" in page for page in pages):
+        return {
+            page["id"]: {"title": page["title"], "hash": page["hash"], "position": position}
+            for position, page in enumerate(pages)
+        }
+
+    sections = split_sections(data.get("content", ""))
+    if not by_title and len(pages) == len(sections):
+        keys = [page["id"] for page in pages]
+    else:
+        keys = []
+        seen: dict[str, int] = {}
+        for section in sections:
+            title = section_title(section)
+            seen[title] = seen.get(title, 0) + 1
+            keys.append(title if seen[title] == 1 else f"{title}#{seen[title]}")
+    return {
+        key: {"title": section_title(section), "hash": section_hash(section), "position": position}
+        for position, (key, section) in enumerate(zip(keys, sections))
+    }
+
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """
+    Section-level diff between two snapshots. Sections are compared by hash; only
+    sections whose hash changed are diffed line by line to size the change.
+    Added and changed sections are reported by page id; sections removed from a
+    snapshot without a page index can only be reported by title.
+    """
+    by_title = not _has_page_index(old)
+    old_index = section_index(old, by_title)
+    new_index = section_index(new, by_title)
+
+    added = [key for key in new_index if key not in old_index]
+    removed = [key for key in old_index if key not in new_index]
+    changed = [key for key in new_index
+               if key in old_index and new_index[key]["hash"] != old_index[key]["hash"]]
+
+    line_counts = {}
+    if changed:
+        old_sections = split_sections(old.get("content", ""))
+        new_sections = split_sections(new.get("content", ""))
+        for key in changed:
+            before = old_sections[old_index[key]["position"]].splitlines()
+            after = new_sections[new_index[key]["position"]].splitlines()
+            plus = minus = 0
+            for line in difflib.unified_diff(before, after, lineterm="", n=0):
+                if line.startswith("+") and not line.startswith("+++"):
+                    plus += 1
+                elif line.startswith("-") and not line.startswith("---"):
+                    minus += 1
+            line_counts[key] = (plus, minus)
+
+    titles = {key: (new_index.get(key) or old_index[key])["title"] for key in added + removed + changed}
+    unchanged = len(new_index) - len(added) - len(changed)
+
+    if by_title:
+        # Report sections of the new snapshot by page id, like every later diff
+        ids = {info["position"]: key for key, info in section_index(new).items()}
+        to_id = {key: ids[info["position"]] for key, info in new_index.items()}
+        added = [to_id[key] for key in added]
+        changed = [to_id[key] for key in changed]
+        titles.update({to_id[key]: titles[key] for key in to_id if key in titles})
+        line_counts = {to_id[key]: counts for key, counts in line_counts.items()}
+
+    return {
+        "since": old.get("last_updated"),
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": unchanged,
+        "titles": titles,
+        "line_counts": line_counts,
+    }
+
+
+def changed_sections(data: dict, since_generation: Optional[int]) -> Optional[set[str]]:
+    """
+    Ids of the sections added or changed after since_generation, for caches built from an
+    earlier write of this snapshot. None when the snapshot's change history doesn't reach
+    back that far (or since_generation is unknown): the cache must be rebuilt in full.
+    """
+    generation = data.get("generation")
+    if since_generation is None or generation is None or since_generation > generation:
+        return None
+    moved: set[str] = set()
+    needed = since_generation + 1
+    for entry in _change_history(data):
+        if entry["generation"] < needed:
+            continue
+        if entry["generation"] != needed:
+            return None
+        moved.update(entry["added"], entry["changed"])
+        needed += 1
+    return moved if needed > generation else None
+
+
+def _change_history(data: dict) -> list[dict]:
+    changes = data.get("changes")
+    # Snapshots from before the change history kept a single, generation-less entry
+    return changes if isinstance(changes, list) else []
+
+
+def format_changelog_entry(diff: dict, timestamp: str) -> str:
+    titles = diff["titles"]
+    lines = [
+        f"## {timestamp[:16].replace('T', ' ')} UTC — "
+        f"{len(diff['changed'])} changed, {len(diff['added'])} added, {len(diff['removed'])} removed"
+    ]
+    for key in diff["changed"]:
+        plus, minus = diff["line_counts"].get(key, (0, 0))
+        lines.append(f"- Changed: {titles[key]} (+{plus}/-{minus} lines)")
+    lines.extend(f"- Added: {titles[key]}" for key in diff["added"])
+    lines.extend(f"- Removed: {titles[key]}" for key in diff["removed"])
+    return "\n".join(lines)
+
+
+def append_changelog(path: str, entry: str, max_entries: int = 200):
+    """Prepend an entry to a Markdown changelog, keeping the newest max_entries."""
+    header = "# Data Room Changelog\n"
+    entries = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            body = f.read()[len(header):].strip()
+        entries = [e if e.startswith("## ") else f"## {e}" for e in body.split("\n\n## ") if e]
+    entries = [entry] + entries[:max_entries - 1]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + "\n" + "\n\n".join(entries) + "\n")
+
+
+def record_changes(old: dict, new: dict, changelog_path: Optional[str] = None,
+                   history: int = CHANGE_HISTORY) -> dict:
+    """
+    Diff new against the previous snapshot, give new the next generation number and
+    append the compact change set to its history (see changed_sections), and log it to
+    the changelog when anything moved.
+    """
+    diff = diff_snapshots(old, new) if old else {
+        "since": None, "added": list(section_index(new)), "removed": [], "changed": [],
+        "unchanged": 0, "titles": {}, "line_counts": {},
+    }
+    new["generation"] = old.get("generation", 0) + 1
+    entry = {"generation": new["generation"], **{key: diff[key] for key in ("since", "added", "changed", "removed")}}
+    new["changes"] = (_change_history(old) + [entry])[-history:]
+
+    moved = diff["added"] or diff["removed"] or diff["changed"]
+    if old and moved and changelog_path:
+        append_changelog(changelog_path, format_changelog_entry(diff, new["last_updated"]))
+    return diff
@@ -0,0 +1,63 @@
+"""
+CLI startup regression tests.
+`cli.py --help` must not import the Anthropic or Notion SDKs, and a cached `--summary`
+must answer from the snapshot without importing notion_client or needing NOTION_API_KEY.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from fake_anthropic import make_server  # noqa: E402
+
+
+def _imported_modules(stderr: str) -> set[str]:
+    """Top-level package names from `python -X importtime` output."""
+    modules = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+    return modules
+
+
+def _run_cli(*args: str, env: dict = None) -> subprocess.CompletedProcess:
+    run_env = {**os.environ, "NOTION_API_KEY": "", **(env or {})}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "cli.py", *args],
+        cwd=REPO_DIR, env=run_env, capture_output=True, text=True, timeout=60
+    )
+
+
+@pytest.fixture
+def fake_anthropic():
+    server = make_server(port=0, ttft=0.0, tokens_per_second=10000, output_tokens=20)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_help_imports_no_sdks():
+    result = _run_cli("--help")
+    assert result.returncode == 0
+    modules = _imported_modules(result.stderr)
+    assert "anthropic" not in modules
+    assert "notion_client" not in modules
+    assert "agent" not in modules
+
+
+@pytest.mark.skipif(
+    not os.path.exists(os.path.join(REPO_DIR, "data_room_cache.json")),
+    reason="needs the committed data room snapshot"
+)
+def test_cached_summary_skips_notion(fake_anthropic):
+    result = _run_cli("--summary", env={"ANTHROPIC_BASE_URL": fake_anthropic, "ANTHROPIC_API_KEY": "fake"})
+    assert result.returncode == 0, result.stdout
+    assert "Data Room Summary" in result.stdout
+    assert "notion_client" not in _imported_modules(result.stderr)
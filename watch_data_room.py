@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Watch Notion for data room edits and keep snapshots fresh.
+Polls Notion search for pages edited since a stored cursor, refetches only those
+pages, and swaps in the new snapshot atomically. One search request covers every
+watched room, so polling every few minutes stays well within the rate limit.
+
+Run alongside the app:
+    python watch_data_room.py --interval 300
+    python watch_data_room.py --all --once
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+from data_rooms import DataRoom, load_registry, normalize_page_id
+from grounding import update_grounding_index
+from notion_client_helper import NotionDataRoom, parse_notion_time
+from snapshot import (
+    load_snapshot, page_meta, record_changes, render_section, section_hash, split_sections, write_snapshot
+)
+
+MAX_DEPTH = 10  # Same depth limit as NotionDataRoom._collect_pages
+# Notion rounds last_edited_time down to the minute; a minute is settled (no further edit
+# can carry its timestamp) once it has passed, plus slack for clock skew
+SETTLE_TIME = timedelta(minutes=2)
+# Notion search indexes edits eventually: a page can surface after newer ones, carrying an
+# older timestamp, so each poll searches back this far and skips results already applied
+SEARCH_OVERLAP = timedelta(minutes=15)
+
+
+def floor_minute(moment: datetime) -> datetime:
+    """Round down to Notion's last_edited_time precision."""
+    return moment.replace(second=0, microsecond=0)
+
+
+class RoomWatcher:
+    def __init__(self, notion: NotionDataRoom, room: DataRoom):
+        self.notion = notion
+        self.room = room
+        self.pages: dict[str, dict] = {}
+        self.cursor = datetime.now(timezone.utc)
+        # (page id, last_edited_time) of results applied within the search overlap
+        self.seen: set[tuple[str, str]] = set()
+        self.failed: set[str] = set()
+        self._load()
+
+    def _load(self):
+        """Seed the page index from the snapshot, or crawl once if it has none."""
+        data = load_snapshot(self.room.snapshot_path)
+        metas = data.get("pages") or []
+        sections = split_sections(data.get("content", ""))
+
+        if not metas or len(metas) != len(sections) or not data.get("cursor"):
+            print(f"[{self.room.slug}] Snapshot has no page index; running a full crawl first")
+            self.full_crawl()
+            return
+
+        for meta, section in zip(metas, sections):
+            # Snapshots written before section hashes existed get them once here
+            self.pages[normalize_page_id(meta["id"])] = {"hash": section_hash(section), **meta, "section": section}
+        self.cursor = datetime.fromisoformat(data["cursor"])
+        self.seen = {tuple(entry) for entry in data.get("seen", [])}
+        # Snapshots written before the overlap kept only the ids seen at the cursor minute
+        self.seen.update((page_id, self.cursor.isoformat()) for page_id in data.get("cursor_ids", []))
+        print(f"[{self.room.slug}] Watching {len(self.pages)} pages edited since {self.cursor.isoformat()}")
+
+    def full_crawl(self):
+        self.cursor = floor_minute(datetime.now(timezone.utc))
+        self.seen = set()
+        self.notion.clear_cache()
+        self.pages = {}
+        for page in self.notion.get_all_pages():
+            self._store(page)
+        self.notion.save_database_cache()
+        self._write()
+
+    def _store(self, page: dict):
+        meta = page_meta(page)
+        meta["section"] = render_section(page["title"], page["text"])
+        self.pages[normalize_page_id(page["id"])] = meta
+
+    def _database_pages(self) -> dict[str, str]:
+        """Map each child database to the page that renders it."""
+        return {
+            normalize_page_id(database_id): page_id
+            for page_id, meta in self.pages.items()
+            for database_id in meta.get("databases", [])
+        }
+
+    def since(self) -> datetime:
+        """Start of the next search: the cursor, less the overlap for late-indexed edits."""
+        return self.cursor - SEARCH_OVERLAP
+
+    def apply(self, results: list[dict]) -> bool:
+        """Refetch the pages touched by a batch of search results. Returns True if the snapshot changed."""
+        database_pages = self._database_pages()
+        # Pages that failed to refetch last time are retried
+        changed, self.failed = set(self.failed), set()
+        newest = self.cursor
+        settled = datetime.now(timezone.utc) - SETTLE_TIME
+
+        for result in results:
+            result_id = normalize_page_id(result["id"])
+            edited = parse_notion_time(result["last_edited_time"])
+            key = (result_id, edited.isoformat())
+            if edited < self.since() or key in self.seen:
+                continue
+            # Notion timestamps are minute-rounded: a result is only marked applied once its
+            # minute has settled, so a later edit within the same minute is still refetched
+            if edited <= settled:
+                self.seen.add(key)
+
+            parent = result.get("parent", {})
+            if result_id in self.pages:
+                changed.add(result_id)
+            elif parent.get("type") == "database_id":
+                # An edited database row re-renders the page holding that database
+                page_id = database_pages.get(normalize_page_id(parent["database_id"]))
+                if page_id:
+                    changed.add(page_id)
+
+            newest = max(newest, edited)
+
+        self.cursor = newest
+        self.seen = {key for key in self.seen if datetime.fromisoformat(key[1]) >= self.since()}
+        if not changed:
+            return False
+
+        print(f"[{self.room.slug}] Refetching {len(changed)} edited page(s)")
+        before = self._fingerprint()
+        self.notion.clear_cache()
+        for page_id in changed:
+            self._refetch(page_id)
+        self.notion.save_database_cache()
+        # A refetch often returns what we already have (repeat polls of an unsettled minute,
+        # overlap results): writing anyway would bump the generation and invalidate caches
+        if self._fingerprint() == before:
+            print(f"[{self.room.slug}] No sections changed")
+            return False
+        self._write()
+        return True
+
+    def _fingerprint(self) -> list[tuple[str, str]]:
+        """Page ids and section hashes in crawl order: equal fingerprints mean equal snapshots."""
+        return [(normalize_page_id(meta["id"]), meta["hash"]) for meta in self._ordered_pages()]
+
+    def _refetch(self, page_id: str, depth: int = 0):
+        """Fetch one page, plus any child pages not seen before."""
+        try:
+            page = self.notion.get_page_content(page_id)
+        except Exception as e:
+            print(f"Error fetching page {page_id}: {e}")
+            self.failed.add(normalize_page_id(page_id))
+            return
+        self._store(page)
+
+        if depth < MAX_DEPTH:
+            for child_id in page_meta(page)["children"]:
+                if normalize_page_id(child_id) not in self.pages:
+                    self._refetch(child_id, depth + 1)
+
+    def _ordered_pages(self) -> list[dict]:
+        """Pages in crawl order (depth-first from the root); unreachable pages are dropped."""
+        ordered = []
+        seen = set()
+
+        def visit(page_id: str, depth: int):
+            page_id = normalize_page_id(page_id)
+            if depth > MAX_DEPTH or page_id in seen or page_id not in self.pages:
+                return
+            seen.add(page_id)
+            meta = self.pages[page_id]
+            ordered.append(meta)
+            for child_id in meta["children"]:
+                visit(child_id, depth + 1)
+
+        visit(self.room.root_page_id, 0)
+        self.pages = {normalize_page_id(meta["id"]): meta for meta in ordered}
+        return ordered
+
+    def _write(self):
+        pages = self._ordered_pages()
+        content = "\n\n".join(meta["section"] for meta in pages)
+        cache_data = {
+            "last_updated": datetime.now(timezone.utc).isoformat(),
+            "page_count": len(pages),
+            "cursor": self.cursor.isoformat(),
+            "seen": sorted(self.seen),
+            "pages": [{k: v for k, v in meta.items() if k != "section"} for meta in pages],
+            "content": content,
+        }
+        diff = record_changes(load_snapshot(self.room.snapshot_path), cache_data, self.room.changelog_path)
+        write_snapshot(self.room.snapshot_path, cache_data)
+        update_grounding_index(self.room, cache_data)
+        print(f"[{self.room.slug}] Snapshot updated: {len(pages)} pages, {len(content)} characters "
+              f"({len(diff['changed'])} changed, {len(diff['added'])} added, {len(diff['removed'])} removed)")
+
+
+def poll(notion: NotionDataRoom, watchers: list[RoomWatcher]):
+    """One search for all rooms, from the earliest start among them."""
+    since = min(watcher.since() for watcher in watchers)
+    results = notion.search_edited_since(since)
+    for watcher in watchers:
+        watcher.apply(results)
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Keep data room snapshots fresh from Notion edits")
+    parser.add_argument("--room", action="append",
+                        help="Room slug or root page id to watch (repeatable; default room if omitted)")
+    parser.add_argument("--all", action="store_true", help="Watch every room in data_rooms.json")
+    parser.add_argument("--interval", type=float, default=300, help="Seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    args = parser.parse_args()
+
+    notion_key = os.getenv("NOTION_API_KEY")
+    if not notion_key:
+        print("Error: NOTION_API_KEY not set")
+        sys.exit(1)
+
+    registry = load_registry()
+    try:
+        rooms = registry.rooms() if args.all else [registry.resolve(key) for key in args.room or [None]]
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
+
+    watchers = [
+        RoomWatcher(
+            NotionDataRoom(
+                notion_key, room.root_page_id,
+                database_cache_path=room.database_cache_path,
+                max_database_rows=room.max_database_rows
+            ),
+            room
+        )
+        for room in rooms
+    ]
+    search_client = watchers[0].notion
+
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                poll(search_client, watchers)
+            except Exception as e:
+                print(f"Poll failed: {e}")
+            if args.once:
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == "__main__":
+    main()